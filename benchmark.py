@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import static_detection
+from feature_extraction import (FEATURE_SLICES, get_flexions, normalize_pose_keypoints, normalize_pose_keypoints_batch,
+                                process_keypoints, process_keypoints_batch)
+from static_detection import GestureIndex, build_matcher, check_gesture_match, get_gesture_store, thresholds
+
+# Headless benchmarks for the per-frame hot paths. Nothing here touches the camera or MediaPipe:
+# keypoint frames are synthetic (or loaded from .npz landmark dumps), and feature frames are
+# replayed from the recorded gesture samples.
+
+# Startup budget, in seconds, for importing each entry point (and for the first match) in a fresh
+# interpreter. Tools that never touch the camera must not pay for cv2 or MediaPipe.
+STARTUP_BUDGETS = {
+    "python": ("pass", 0.1),
+    "import static_detection": ("import static_detection", 0.5),
+    "first match": ("import static_detection; static_detection.get_gesture_index()", 0.75),
+    "import static_data_collection": ("import static_data_collection", 0.5),
+    "import landmark_log": ("import landmark_log", 0.5),
+    "import pipeline": ("import pipeline", 0.5),  # cv2 and MediaPipe are only imported for live frames
+    "import main": ("import main", 2.0),
+}
+
+def synthetic_keypoints(frames, rng, missing_hand_rate=0.2):
+    """Random (left_hand, right_hand, pose) arrays, with some hands left undetected like MediaPipe does."""
+    left_hands = rng.random((frames, 21, 3))
+    right_hands = rng.random((frames, 21, 3))
+    poses = rng.random((frames, 33, 3))
+    left_hands[rng.random(frames) < missing_hand_rate] = 0
+    right_hands[rng.random(frames) < missing_hand_rate] = 0
+    return left_hands, right_hands, poses
+
+def recorded_keypoints(paths):
+    from refeaturize import load_landmarks
+
+    arrays = [load_landmarks(path) for path in paths]
+    return tuple(np.concatenate([array[i] for array in arrays]) for i in range(3))
+
+def recorded_features(frames, rng, noise=0.02):
+    """Replay recorded gesture samples (with a little noise) as feature frames."""
+    samples = np.concatenate([np.asarray(samples, dtype=np.float64) for _, samples in get_gesture_store().items()])
+    samples = np.nan_to_num(samples)
+    rows = samples[rng.integers(len(samples), size=frames)]
+    return rows + rng.normal(0, noise, rows.shape) * np.abs(rows)
+
+def scaled_gesture_ranges(vocabulary_size, rng):
+    """Grow the recorded gesture ranges to vocabulary_size gestures by jittering copies of them."""
+    gesture_ranges = static_detection.gesture_ranges
+    names = list(gesture_ranges)
+    scaled = {}
+    for i in range(vocabulary_size):
+        source = gesture_ranges[names[i % len(names)]]
+        if i < len(names):
+            scaled[names[i]] = source
+            continue
+
+        feature_ranges = {}
+        for feature, feature_range in source.items():
+            offset = rng.normal(0, 0.1, len(feature_range["min"])) * np.abs(feature_range["min"])
+            feature_ranges[feature] = {"min": feature_range["min"] + offset, "max": feature_range["max"] + offset}
+        scaled[f"{names[i % len(names)]}#{i}"] = feature_ranges
+    return scaled
+
+def measure(function, calls, frames_per_call=1, alloc_calls=200):
+    """Time function(i) for i in range(calls) and measure its peak allocation with tracemalloc."""
+    latencies = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter()
+        function(i)
+        latencies[i] = time.perf_counter() - start
+
+    peaks = []
+    tracemalloc.start()
+    for i in range(min(calls, alloc_calls)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        function(i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        "frames_per_sec": calls * frames_per_call / latencies.sum(),
+        "p50_ms": np.percentile(latencies, 50) * 1000 / frames_per_call,
+        "p99_ms": np.percentile(latencies, 99) * 1000 / frames_per_call,
+        "alloc_kib_per_frame": np.mean(peaks) / 1024 / frames_per_call,
+    }
+
+def run_benchmarks(frames=2000, batch_size=256, vocabulary_sizes=(31, 100, 300, 1000), landmark_paths=(), seed=0):
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    if landmark_paths:
+        left_hands, right_hands, poses = recorded_keypoints(landmark_paths)
+    else:
+        left_hands, right_hands, poses = synthetic_keypoints(frames, rng)
+    frames = len(poses)
+
+    # The single-frame API is fed the same tuple lists main.py builds from MediaPipe results
+    left_lists = [[tuple(point) for point in hand] for hand in left_hands.tolist()]
+    right_lists = [[tuple(point) for point in hand] for hand in right_hands.tolist()]
+    pose_lists = [[tuple(point) for point in pose] for pose in poses.tolist()]
+
+    results["process_keypoints"] = measure(lambda i: process_keypoints(left_lists[i], right_lists[i], pose_lists[i]), frames)
+    results["get_flexions"] = measure(lambda i: get_flexions(right_lists[i]), frames)
+    results["normalize_pose_keypoints"] = measure(lambda i: normalize_pose_keypoints(pose_lists[i]), frames)
+
+    batches = max(1, frames // batch_size)
+    results[f"process_keypoints_batch[{batch_size}]"] = measure(
+        lambda i: process_keypoints_batch(
+            left_hands[i * batch_size:(i + 1) * batch_size],
+            right_hands[i * batch_size:(i + 1) * batch_size],
+            poses[i * batch_size:(i + 1) * batch_size],
+        ),
+        batches,
+        frames_per_call=min(batch_size, frames),
+    )
+    results[f"normalize_pose_keypoints_batch[{batch_size}]"] = measure(
+        lambda i: normalize_pose_keypoints_batch(poses[i * batch_size:(i + 1) * batch_size]),
+        batches,
+        frames_per_call=min(batch_size, frames),
+    )
+
+    features = recorded_features(frames, rng)
+    feature_lists = [tuple(row[FEATURE_SLICES[feature]].tolist() for feature in FEATURE_SLICES) for row in features]
+    default_index = static_detection.gesture_index
+    try:
+        for vocabulary_size in vocabulary_sizes:
+            index = GestureIndex(scaled_gesture_ranges(vocabulary_size, rng), thresholds)
+            static_detection.gesture_index = index
+            results[f"check_gesture_match[G={vocabulary_size}]"] = measure(
+                lambda i: check_gesture_match(*feature_lists[i]), frames)
+            results[f"GestureIndex.match_batch[G={vocabulary_size}]"] = measure(
+                lambda i: index.match_batch(features[i * batch_size:(i + 1) * batch_size]),
+                batches,
+                frames_per_call=min(batch_size, frames),
+            )
+    finally:
+        static_detection.gesture_index = default_index
+
+    knn_index = build_matcher("knn")
+    results[f"NearestNeighborIndex.match_batch[G={len(knn_index.names)}]"] = measure(
+        lambda i: knn_index.match_batch(features[i * batch_size:(i + 1) * batch_size]),
+        batches,
+        frames_per_call=min(batch_size, frames),
+    )
+
+    return results
+
+def measure_startup(budgets=STARTUP_BUDGETS, repeats=3):
+    """Time each snippet in a fresh interpreter; returns {name: (best seconds or None if it failed, budget)}."""
+    results = {}
+    for name, (code, budget) in budgets.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       capture_output=True)
+            if completed.returncode != 0:
+                timings = None
+                break
+            timings.append(time.perf_counter() - start)
+        results[name] = (min(timings) if timings else None, budget)
+    return results
+
+def format_startup(results):
+    lines = [f"{'startup':<40} {'seconds':>9} {'budget':>9}"]
+    for name, (seconds, budget) in results.items():
+        if seconds is None:
+            lines.append(f"{name:<40} {'failed':>9} {budget:>9.2f}  OVER BUDGET")
+        else:
+            status = "" if seconds <= budget else "  OVER BUDGET"
+            lines.append(f"{name:<40} {seconds:>9.3f} {budget:>9.2f}{status}")
+    return "\n".join(lines)
+
+def format_results(results):
+    lines = [f"{'benchmark':<40} {'frames/s':>12} {'p50 ms':>9} {'p99 ms':>9} {'alloc KiB':>10}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<40} {result['frames_per_sec']:>12.0f} {result['p50_ms']:>9.4f} "
+            f"{result['p99_ms']:>9.4f} {result['alloc_kib_per_frame']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark feature extraction and gesture matching without a camera.")
+    parser.add_argument("--frames", type=int, default=2000, help="Synthetic frames to replay")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--vocab", default="31,100,300,1000", help="Comma-separated vocabulary sizes for matching")
+    parser.add_argument("--landmarks", nargs="*", default=[], help=".npz landmark dumps or .lmk landmark logs to replay instead of synthetic frames")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--startup", action="store_true",
+                        help="Only check startup times against the budget; exits with 1 if any is over or fails to import")
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = measure_startup()
+        print(format_startup(startup))
+        sys.exit(any(seconds is None or seconds > budget for seconds, budget in startup.values()))
+
+    results = run_benchmarks(
+        frames=args.frames,
+        batch_size=args.batch_size,
+        vocabulary_sizes=[int(size) for size in args.vocab.split(",")],
+        landmark_paths=args.landmarks,
+        seed=args.seed,
+    )
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
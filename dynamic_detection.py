@@ -0,0 +1,90 @@
+import numpy as np
+from feature_extraction import FEATURE_SIZE, FEATURE_SLICES
+from gesture_store import DYNAMIC
+from static_detection import thresholds
+
+MAX_DISTANCE = 1.0  # Average per-frame distance, in threshold units, that still counts as a match
+
+def load_templates(store):
+    """Return {gesture name: [(frames, FEATURE_SIZE) sequence, ...]} for every dynamic gesture in the store."""
+    return {
+        gesture_name: [np.asarray(sequence, dtype=np.float64) for sequence in store.sequences(gesture_name) if len(sequence)]
+        for gesture_name, _ in store.items(DYNAMIC)
+    }
+
+class DynamicGestureRecognizer:
+    """Matches the live feature stream against recorded motion templates with incremental DTW.
+
+    Every template keeps one column of a subsequence-DTW cost matrix (open begin, so a sign
+    can start at any frame). Each new frame updates all columns together, so the cost per
+    frame depends only on the total template length, never on how long the stream has run.
+    Frame distances are the largest per-feature difference in threshold units, and a template
+    matches when its best alignment ending at the current frame averages below max_distance.
+    """
+
+    def __init__(self, templates, thresholds=thresholds, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.names = []
+        sequences = []
+        for gesture_name, gesture_sequences in templates.items():
+            for sequence in gesture_sequences:
+                self.names.append(gesture_name)
+                sequences.append(sequence)
+
+        scale = np.empty(FEATURE_SIZE)
+        for feature, columns in FEATURE_SLICES.items():
+            scale[columns] = thresholds[feature.capitalize()]
+
+        self.lengths = np.array([len(sequence) for sequence in sequences], dtype=int)
+        max_length = self.lengths.max() if len(sequences) else 0
+
+        # Padded (templates, max length, FEATURE_SIZE); padding frames can never be reached
+        self.templates = np.zeros((len(sequences), max_length, FEATURE_SIZE))
+        self.masks = np.zeros((len(sequences), 1, FEATURE_SIZE), dtype=bool)
+        for row, sequence in enumerate(sequences):
+            recorded = ~np.isnan(sequence).any(axis=0)
+            self.templates[row, :len(sequence)] = np.nan_to_num(sequence) / scale
+            self.masks[row, 0] = recorded
+        self.scale = scale
+        self.padding = np.arange(max_length)[None, :] >= self.lengths[:, None]
+        self.reset()
+
+    def reset(self):
+        self.cost = np.full(self.padding.shape, np.inf)
+        self.steps = np.ones(self.padding.shape)
+
+    def update(self, features):
+        """Feed one frame's feature vector; returns a gesture name when a motion completes, else None."""
+        if not self.names:
+            return None
+
+        differences = np.abs(self.templates - np.asarray(features, dtype=np.float64) / self.scale)
+        distances = np.where(self.masks, differences, 0.0).max(axis=2)
+        distances[self.padding] = np.inf
+
+        # Best predecessor from the previous stream frame: same template frame, or the one before it
+        diagonal_cost = np.concatenate((np.full((len(self.cost), 1), np.inf), self.cost[:, :-1]), axis=1)
+        diagonal_steps = np.concatenate((np.ones((len(self.steps), 1)), self.steps[:, :-1]), axis=1)
+        use_diagonal = diagonal_cost / diagonal_steps <= self.cost / self.steps
+        previous_cost = np.where(use_diagonal, diagonal_cost, self.cost)
+        previous_steps = np.where(use_diagonal, diagonal_steps, self.steps)
+
+        # ...or the previous template frame in this stream frame, which has to be done column by column
+        cost = np.empty_like(self.cost)
+        steps = np.empty_like(self.steps)
+        cost[:, 0] = distances[:, 0]
+        steps[:, 0] = 1
+        for j in range(1, cost.shape[1]):
+            use_current = cost[:, j - 1] / steps[:, j - 1] < previous_cost[:, j] / previous_steps[:, j]
+            cost[:, j] = distances[:, j] + np.where(use_current, cost[:, j - 1], previous_cost[:, j])
+            steps[:, j] = 1 + np.where(use_current, steps[:, j - 1], previous_steps[:, j])
+        self.cost, self.steps = cost, steps
+
+        rows = np.arange(len(self.lengths))
+        scores = cost[rows, self.lengths - 1] / steps[rows, self.lengths - 1]
+        best = np.argmin(scores)
+        if scores[best] > self.max_distance:
+            return None
+
+        self.reset()  # Start looking for the next sign from scratch
+        return self.names[best]
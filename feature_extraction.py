@@ -1,5 +1,21 @@
 import numpy as np
 
+DISTANCE_PAIRS = [(4, 0), (8, 0), (12, 0), (16, 0), (20, 0), (4, 8), (8, 12), (12, 16), (16, 20)]
+_PAIR_A = np.array([a for a, _ in DISTANCE_PAIRS])
+_PAIR_B = np.array([b for _, b in DISTANCE_PAIRS])
+
+HAND_LANDMARKS = 21
+POSE_LANDMARKS = 33
+
+# Layout of the feature matrix returned by process_keypoints_batch:
+# 9 flexions per hand, xyz position per hand, one rotation per hand (left first)
+FEATURE_SLICES = {
+    "flexion": slice(0, 18),
+    "position": slice(18, 24),
+    "rotation": slice(24, 26),
+}
+FEATURE_SIZE = 26
+
 def calculate_position(wrist, shoulder):
     if wrist == (0, 0, 0) or shoulder == (0, 0, 0):
         return (0, 0, 0)  # Default if no detection
@@ -10,41 +26,58 @@ def calculate_position(wrist, shoulder):
 
     return (x_rel, y_rel, z_rel)  
 
+def _as_frame(keypoints, count):
+    """Convert one frame of keypoints (list of tuples, array or None) to a (count, 3) array."""
+    frame = np.zeros((count, 3))
+    if keypoints is not None and len(keypoints) > 0:
+        keypoints = np.asarray(keypoints, dtype=np.float64)[:count]
+        frame[:len(keypoints)] = keypoints
+    return frame
+
 def process_keypoints(left_hand_keypoints, right_hand_keypoints, pose_keypoints):
-    flexion = []
-    rotation = []
-    position = []
-
-    pose_keypoints = normalize_pose_keypoints(pose_keypoints)  # Normalize pose
-
-    left_shoulder = pose_keypoints[11] if len(pose_keypoints) > 11 else (0, 0, 0)
-    right_shoulder = pose_keypoints[12] if len(pose_keypoints) > 12 else (0, 0, 0)
-
-    # Process left hand if available
-    if left_hand_keypoints:
-        flexion.extend(get_flexions(left_hand_keypoints))
-        rotation.append(calculate_rotation(left_hand_keypoints[0], left_hand_keypoints[5]))
-        position.append(calculate_position(left_hand_keypoints[0], left_shoulder))
-    else:
-        flexion.extend([0] * 9)
-        rotation.append(0)
-        position.append((0, 0, 0))
-
-    # Process right hand if available (add to the same features)
-    if right_hand_keypoints:
-        flexion.extend(get_flexions(right_hand_keypoints))
-        rotation.append(calculate_rotation(right_hand_keypoints[0], right_hand_keypoints[5]))
-        position.append(calculate_position(right_hand_keypoints[0], right_shoulder))
-    else:
-        flexion.extend([0] * 9)
-        rotation.append(0)
-        position.append((0, 0, 0))
-
-    # Flatten position (since it contains tuples)
-    position = [coord for pos in position for coord in pos]
+    features = process_keypoints_batch(
+        _as_frame(left_hand_keypoints, HAND_LANDMARKS)[None],
+        _as_frame(right_hand_keypoints, HAND_LANDMARKS)[None],
+        _as_frame(pose_keypoints, POSE_LANDMARKS)[None],
+    )[0]
+
+    flexion = features[FEATURE_SLICES["flexion"]].tolist()
+    position = features[FEATURE_SLICES["position"]].tolist()
+    rotation = features[FEATURE_SLICES["rotation"]].tolist()
 
     return flexion, position, rotation
 
+def process_keypoints_batch(left_hands, right_hands, poses):
+    """Compute the (N, 26) feature matrix for N frames of (21, 3) hands and (33, 3) poses.
+
+    All-zero keypoints are treated as undetected, exactly like process_keypoints.
+    """
+    # Both hands are processed together as one (N, 2, 21, 3) array, left first
+    hands = np.stack((np.asarray(left_hands, dtype=np.float64), np.asarray(right_hands, dtype=np.float64)), axis=1)
+    return _features(hands, np.asarray(poses, dtype=np.float64))
+
+def extract_features(hands, pose):
+    """Compute one frame's (26,) feature vector from (2, 21, 3) hands (left first) and a (33, 3) pose.
+
+    Takes the arrays of a LandmarkBuffer as they are, without building keypoint lists.
+    """
+    return _features(np.asarray(hands, dtype=np.float64)[None], np.asarray(pose, dtype=np.float64)[None])[0]
+
+def _features(hands, poses):
+    hands_detected = _is_detected(hands)
+    pose_detected = _is_detected(poses)
+    poses = _scale_by_distance(poses, pose_detected, 11, 12)  # Normalize pose
+
+    frames = len(poses)
+    features = np.empty((frames, FEATURE_SIZE))
+    features[:, FEATURE_SLICES["flexion"]] = _flexions(hands, hands_detected).reshape(frames, -1)
+    features[:, FEATURE_SLICES["position"]] = _positions(
+        hands[:, :, 0], hands_detected[:, :, 0], poses[:, 11:13], pose_detected[:, 11:13]).reshape(frames, -1)
+    features[:, FEATURE_SLICES["rotation"]] = _rotations(
+        hands[:, :, 0], hands_detected[:, :, 0], hands[:, :, 5], hands_detected[:, :, 5])
+
+    return features
+
 def euclidean_distance(a, b):
     return np.linalg.norm(np.array(a) - np.array(b))
 
@@ -79,19 +112,39 @@ def normalize_pose_keypoints(pose_keypoints):
     
     return [(x / scale_factor, y / scale_factor, z / scale_factor) if (x, y, z) != (0, 0, 0) else (0, 0, 0) for x, y, z in pose_keypoints]
 
+def _is_detected(keypoints):
+    """Boolean mask of keypoints that are not (0, 0, 0)."""
+    return (keypoints != 0).any(axis=-1)
+
+def _norm(vectors):
+    return np.sqrt((vectors * vectors).sum(axis=-1))
+
+def _scale_by_distance(keypoints, detected, a, b):
+    """Divide (..., K, 3) keypoints by the distance between landmarks a and b, where possible."""
+    scale_factor = _norm(keypoints[..., a, :] - keypoints[..., b, :])
+    usable = detected[..., a] & detected[..., b] & (scale_factor != 0)
+    scale_factor = np.where(usable, scale_factor, 1.0)  # Leave frames unmodified otherwise
+
+    return keypoints / scale_factor[..., None, None]
+
+def normalize_pose_keypoints_batch(pose_keypoints):
+    """normalize_pose_keypoints for (..., 33, 3) poses, as process_keypoints_batch normalizes them."""
+    pose_keypoints = np.asarray(pose_keypoints, dtype=np.float64)
+    return _scale_by_distance(pose_keypoints, _is_detected(pose_keypoints), 11, 12)
+
 def get_flexions(keypoints):
-    keypoints = normalize_keypoints(keypoints)  # Normalize before computing distances
-    distance_pairs = [(4, 0), (8, 0), (12, 0), (16, 0), (20, 0), (4, 8), (8, 12), (12, 16), (16, 20)]
-    flexions = []
-    
-    for a, b in distance_pairs:
-        if keypoints[a] != (0, 0, 0) and keypoints[b] != (0, 0, 0):
-            distance = euclidean_distance(keypoints[a], keypoints[b])
-        else:
-            distance = 0  
-        flexions.append(distance)
-    
-    return flexions
+    return get_flexions_batch(_as_frame(keypoints, HAND_LANDMARKS)[None])[0].tolist()
+
+def get_flexions_batch(keypoints):
+    """Compute the (..., 9) flexion distances for (..., 21, 3) hand keypoints."""
+    keypoints = np.asarray(keypoints, dtype=np.float64)
+    return _flexions(keypoints, _is_detected(keypoints))
+
+def _flexions(keypoints, detected):
+    keypoints = _scale_by_distance(keypoints, detected, 0, 5)  # Normalize before computing distances
+    distances = _norm(keypoints[..., _PAIR_A, :] - keypoints[..., _PAIR_B, :])
+
+    return np.where(detected[..., _PAIR_A] & detected[..., _PAIR_B], distances, 0.0)
 
 def calculate_rotation(wrist, index_base):
     if wrist == (0, 0, 0) or index_base == (0, 0, 0):  
@@ -104,6 +157,14 @@ def calculate_rotation(wrist, index_base):
     
     return angle 
 
+def _rotations(wrists, wrists_detected, index_bases, index_bases_detected):
+    angles = np.degrees(np.arctan2(index_bases[..., 1] - wrists[..., 1], index_bases[..., 0] - wrists[..., 0]))
+
+    return np.where(wrists_detected & index_bases_detected, angles, 0.0)
+
+def _positions(wrists, wrists_detected, shoulders, shoulders_detected):
+    return np.where((wrists_detected & shoulders_detected)[..., None], wrists - shoulders, 0.0)
+
 def calculate_roll(wrist, pinky_base):
     if wrist == (0, 0, 0) or pinky_base == (0, 0, 0):
         return 0  
@@ -0,0 +1,134 @@
+from collections import deque, Counter
+
+GESTURE_COMBINATIONS = {
+    ("mabuti", "kamusta"): "magandang umaga",
+    ("salamat1", "resting"): "salamat",
+    ("mabuti", "c"): "magandang gabi"
+}
+
+EXCLUDED_WORDS = {"resting", "mabuti", "salamat1"}
+FILTERED_HISTORY_LIMIT = 10
+GESTURE_HOLD_THRESHOLD = 5  # Number of frames the gesture must be held
+FAST_HOLD_THRESHOLD = 2  # ...or only this many, if it is a confident match throughout
+CONFIDENT_DISTANCE = 0.5  # A confident match is at most this far from its range (in thresholds)
+CONFIDENT_MARGIN = 0.5  # ...and at least this much closer than any other gesture
+
+class Transcript:
+    """Folds accepted gestures into the displayed words one at a time.
+
+    Combinations are kept in a trie over their reversed gesture sequences, so each new
+    gesture walks back through the gestures pending since the last combination and picks
+    the longest combination ending with it. Combinations can be any number of signs long.
+    """
+
+    def __init__(self, combinations=GESTURE_COMBINATIONS, excluded_words=EXCLUDED_WORDS, limit=FILTERED_HISTORY_LIMIT):
+        self.trie = {}
+        for sequence, combined_word in combinations.items():
+            node = self.trie
+            for gesture in reversed(sequence):
+                node = node.setdefault(gesture, {})
+            node[None] = combined_word  # None marks the end of a combination
+        self.excluded_words = excluded_words
+        self.pending = deque(maxlen=max(map(len, combinations), default=1))
+        self.words = deque(maxlen=limit)
+        self.text = ""
+
+    def push(self, gesture):
+        """Add one accepted gesture; returns True if the text changed."""
+        self.pending.append(gesture)
+        combined_word = None
+        node = self.trie
+        for pending_gesture in reversed(self.pending):
+            node = node.get(pending_gesture)
+            if node is None:
+                break
+            combined_word = node.get(None, combined_word)
+
+        if combined_word is not None:
+            self.words.append(combined_word)
+            self.pending.clear()
+        elif gesture not in self.excluded_words:
+            self.words.append(gesture)
+        else:
+            return False
+
+        self.text = "  ".join(self.words)
+        return True
+
+    def clear(self):
+        self.pending.clear()
+        self.words.clear()
+        self.text = ""
+
+def process_filtered_history(raw_history):
+    transcript = Transcript()
+    for gesture in raw_history:
+        transcript.push(gesture)
+    return transcript.words
+
+class GestureHistory:
+    """Turns per-frame matches into accepted signs and the transcript built from them.
+
+    A static match is accepted once it has been seen for hold_threshold frames in a row,
+    or once the matcher's top candidate has been the same confident one (close to its
+    range and well clear of the next gesture) for fast_hold_threshold frames. Ambiguous
+    matches still need the full hold. A completed dynamic match is accepted straight away.
+    """
+
+    def __init__(self, hold_threshold=GESTURE_HOLD_THRESHOLD, transcript=None, fast_hold_threshold=FAST_HOLD_THRESHOLD,
+                 confident_distance=CONFIDENT_DISTANCE, confident_margin=CONFIDENT_MARGIN):
+        self.hold_threshold = hold_threshold
+        self.transcript = transcript or Transcript()
+        self.fast_hold_threshold = fast_hold_threshold
+        self.confident_distance = confident_distance
+        self.confident_margin = confident_margin
+        self.raw_gesture_history = deque(maxlen=10)
+        self.gesture_counter = Counter()
+        self.confident_sign = None
+        self.confident_frames = 0
+        self.current_sign = ""
+
+    def accept_gesture(self, gesture):
+        """Returns True if the transcript text changed."""
+        if self.raw_gesture_history and self.raw_gesture_history[-1] == gesture:
+            return False
+        self.raw_gesture_history.append(gesture)
+        self.current_sign = gesture
+        return self.transcript.push(gesture)
+
+    def is_confident(self, candidate):
+        return candidate.distance <= self.confident_distance and candidate.margin >= self.confident_margin
+
+    def handle_match(self, gesture_match, dynamic_match=None, candidates=None):
+        """Feed one frame's matches, and optionally its ranked candidates; returns True if the transcript text changed."""
+        if dynamic_match:
+            # A completed motion has already been checked across its whole duration
+            self.gesture_counter.clear()
+            self.confident_frames = 0
+            return self.accept_gesture(dynamic_match)
+
+        if self.fast_hold_threshold and candidates and self.is_confident(candidates[0]):
+            if candidates[0].name == self.confident_sign:
+                self.confident_frames += 1
+            else:
+                self.confident_sign, self.confident_frames = candidates[0].name, 1
+            if self.confident_frames >= self.fast_hold_threshold:
+                self.gesture_counter.clear()
+                return self.accept_gesture(self.confident_sign)
+        else:
+            self.confident_frames = 0
+
+        if gesture_match and gesture_match != "No Match":
+            self.gesture_counter[gesture_match] += 1
+            if self.gesture_counter[gesture_match] >= self.hold_threshold:
+                self.gesture_counter.clear()
+                return self.accept_gesture(gesture_match)
+        else:
+            self.gesture_counter.clear()
+        return False
+
+    def clear(self):
+        self.raw_gesture_history.clear()
+        self.gesture_counter.clear()
+        self.confident_frames = 0
+        self.transcript.clear()
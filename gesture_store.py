@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+from feature_extraction import FEATURE_SIZE, FEATURE_SLICES
+
+GESTURE_STORE = "gestures_store"
+LEGACY_JSON = "gestures.json"
+HEADER_FILE = "header.json"
+LOCK_FILE = "header.lock"
+LOCK_TIMEOUT = 10.0  # Seconds to wait for another writer; a lock older than this was left by a crashed one
+STORE_VERSION = 1
+STATIC = "static"
+DYNAMIC = "dynamic"
+
+# Each gesture lives in its own float32 (samples, FEATURE_SIZE) .npy file, laid out like
+# process_keypoints_batch output. Features that were not collected for a sample are NaN.
+# header.json keeps the gesture order and the file each gesture is stored in, so adding
+# or removing one gesture only writes that gesture's file plus the small header.
+# Dynamic (motion) gestures store several recorded sequences back to back, with the
+# length of each sequence kept in the header.
+# Several processes may write to one store (e.g. data collection while the app runs), so
+# every write re-reads the header under a lock file before it picks a file name, and
+# never starts from a header another process has replaced since.
+
+def samples_to_array(samples):
+    """Convert a list of {"flexion": [...], "position": [...], "rotation": [...]} samples to a float32 array."""
+    array = np.full((len(samples), FEATURE_SIZE), np.nan, dtype=np.float32)
+    for row, sample in enumerate(samples):
+        for feature, columns in FEATURE_SLICES.items():
+            if feature in sample:
+                array[row, columns] = sample[feature]
+    return array
+
+def array_to_samples(array):
+    """Inverse of samples_to_array, for exporting back to the JSON layout."""
+    samples = []
+    for row in np.asarray(array, dtype=np.float64):
+        samples.append({
+            feature: row[columns].tolist()
+            for feature, columns in FEATURE_SLICES.items()
+            if not np.isnan(row[columns]).any()
+        })
+    return samples
+
+class GestureStore:
+    def __init__(self, path=GESTURE_STORE):
+        self.path = path
+        self._arrays = {}
+        self._header_mtime = None
+        self.header = self._read_header()
+
+    def _read_header(self):
+        header_path = os.path.join(self.path, HEADER_FILE)
+        if os.path.exists(header_path):
+            self._header_mtime = os.stat(header_path).st_mtime_ns
+            with open(header_path, "r") as f:
+                header = json.load(f)
+        else:
+            header = {"version": STORE_VERSION, "feature_size": FEATURE_SIZE, "next_id": 0, "gestures": {}}
+
+        if header["feature_size"] != FEATURE_SIZE:
+            raise ValueError(f"{self.path} stores {header['feature_size']} features per sample, expected {FEATURE_SIZE}")
+        return header
+
+    def reload(self):
+        """Re-read the header if it changed on disk (e.g. another process added a gesture); returns True if it did.
+
+        Gestures whose file is unchanged keep their memory maps.
+        """
+        try:
+            mtime = os.stat(os.path.join(self.path, HEADER_FILE)).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._header_mtime:
+            return False
+        self._reread_header()
+        return True
+
+    def _reread_header(self):
+        previous = self.header["gestures"]
+        self.header = self._read_header()
+        for gesture_name in list(self._arrays):
+            entry = self.header["gestures"].get(gesture_name)
+            if entry is None or entry["file"] != previous[gesture_name]["file"]:
+                del self._arrays[gesture_name]
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store's lock file and start from the header on disk, whatever this instance last saw."""
+        os.makedirs(self.path, exist_ok=True)
+        lock_path = os.path.join(self.path, LOCK_FILE)
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(lock_path).st_mtime > LOCK_TIMEOUT:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue  # Released meanwhile
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{lock_path} is held by another writer")
+                time.sleep(0.01)
+        try:
+            self._reread_header()  # Unconditionally: the mtime may not have ticked since the last write
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    def __len__(self):
+        return len(self.header["gestures"])
+
+    def __contains__(self, gesture_name):
+        return gesture_name in self.header["gestures"]
+
+    def digest(self):
+        """Hash identifying the stored data: gesture files are never rewritten, only replaced under a new name."""
+        return hashlib.sha1(json.dumps(self.header, sort_keys=True).encode()).hexdigest()
+
+    def __iter__(self):
+        return iter(list(self.header["gestures"]))
+
+    def samples(self, gesture_name):
+        """Return the (samples, FEATURE_SIZE) array for a gesture, memory-mapped on first access."""
+        if gesture_name not in self._arrays:
+            entry = self.header["gestures"][gesture_name]
+            self._arrays[gesture_name] = np.load(os.path.join(self.path, entry["file"]), mmap_mode="r")
+        return self._arrays[gesture_name]
+
+    def kind(self, gesture_name):
+        return self.header["gestures"][gesture_name].get("kind", STATIC)
+
+    def items(self, kind=STATIC):
+        """Yield (name, samples) for every gesture of the given kind (None for all)."""
+        for gesture_name in self:
+            if kind is None or self.kind(gesture_name) == kind:
+                yield gesture_name, self.samples(gesture_name)
+
+    def sequences(self, gesture_name):
+        """Split a dynamic gesture's samples into its recorded (frames, FEATURE_SIZE) sequences."""
+        samples = self.samples(gesture_name)
+        lengths = self.header["gestures"][gesture_name].get("lengths", [len(samples)])
+        return np.split(samples, np.cumsum(lengths)[:-1])
+
+    def add_gesture(self, gesture_name, samples, kind=STATIC, lengths=None):
+        """Store (or replace) one gesture, given JSON-style samples or a (samples, FEATURE_SIZE) array.
+
+        For dynamic gestures, lengths gives the number of frames in each recorded sequence.
+        """
+        if isinstance(samples, np.ndarray):
+            array = np.asarray(samples, dtype=np.float32).reshape(-1, FEATURE_SIZE)
+        else:
+            array = samples_to_array(samples)
+
+        with self._locked():
+            file_name = f"{self.header['next_id']:05d}.npy"
+            self.header["next_id"] += 1
+            np.save(os.path.join(self.path, file_name), array)
+
+            previous = self.header["gestures"].get(gesture_name)
+            entry = {"file": file_name, "samples": len(array)}
+            if kind != STATIC:
+                entry["kind"] = kind
+            if lengths is not None:
+                entry["lengths"] = [int(length) for length in lengths]
+            self.header["gestures"][gesture_name] = entry
+            self._write_header()
+
+            if previous is not None:
+                self._remove_file(gesture_name, previous["file"])
+
+    def remove_gesture(self, gesture_name):
+        with self._locked():
+            entry = self.header["gestures"].pop(gesture_name)
+            self._write_header()
+            self._remove_file(gesture_name, entry["file"])
+
+    def _remove_file(self, gesture_name, file_name):
+        self._arrays.pop(gesture_name, None)
+        try:
+            os.remove(os.path.join(self.path, file_name))
+        except OSError:
+            pass  # Still mapped by another process (Windows); the header no longer references it
+
+    def _write_header(self):
+        header_path = os.path.join(self.path, HEADER_FILE)
+        with open(header_path + ".tmp", "w") as f:
+            json.dump(self.header, f, indent=4)
+        os.replace(header_path + ".tmp", header_path)
+        self._header_mtime = os.stat(header_path).st_mtime_ns
+
+def convert_json(json_path=LEGACY_JSON, store_path=GESTURE_STORE):
+    """Build a gesture store from a gestures.json file."""
+    with open(json_path, "r") as f:
+        gestures_data = json.load(f)
+
+    store = GestureStore(store_path)
+    for gesture_name, samples in gestures_data.items():
+        store.add_gesture(gesture_name, samples)
+    return store
+
+def open_store(path=GESTURE_STORE, legacy_json=LEGACY_JSON):
+    """Open the gesture store, converting the legacy gestures.json on first use (pass None to skip)."""
+    if legacy_json and not os.path.exists(os.path.join(path, HEADER_FILE)) and os.path.exists(legacy_json):
+        return convert_json(legacy_json, path)
+    return GestureStore(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the binary gesture store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert a gestures.json file into a gesture store")
+    convert_parser.add_argument("json_path", nargs="?", default=LEGACY_JSON)
+    convert_parser.add_argument("store_path", nargs="?", default=GESTURE_STORE)
+
+    export_parser = subparsers.add_parser("export", help="Write a gesture store back out as gestures.json")
+    export_parser.add_argument("store_path", nargs="?", default=GESTURE_STORE)
+    export_parser.add_argument("json_path", nargs="?", default=LEGACY_JSON)
+
+    list_parser = subparsers.add_parser("list", help="List the gestures in a store")
+    list_parser.add_argument("store_path", nargs="?", default=GESTURE_STORE)
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        store = convert_json(args.json_path, args.store_path)
+        print(f"Converted {len(store)} gestures from {args.json_path} to {args.store_path}")
+    elif args.command == "export":
+        store = GestureStore(args.store_path)
+        with open(args.json_path, "w") as f:
+            json.dump({name: array_to_samples(samples) for name, samples in store.items(STATIC)}, f, indent=4)
+        print(f"Exported {len(store)} gestures to {args.json_path}")
+    elif args.command == "list":
+        store = GestureStore(args.store_path)
+        for gesture_name in store:
+            print(f"- {gesture_name} ({store.header['gestures'][gesture_name]['samples']} samples, {store.kind(gesture_name)})")
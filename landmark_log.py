@@ -0,0 +1,133 @@
+import argparse
+import os
+import time
+import numpy as np
+from feature_extraction import HAND_LANDMARKS, POSE_LANDMARKS
+from gesture_history import GestureHistory
+
+LOG_MAGIC = b"DMTLMK"
+LOG_VERSION = 1
+HEADER_SIZE = 8
+LOG_EXTENSION = ".lmk"
+
+POSE_PRESENT = 1
+LEFT_HAND_PRESENT = 2
+RIGHT_HAND_PRESENT = 4
+
+# A landmark log is an 8 byte header (magic + version) followed by one fixed-size record
+# per frame: the capture timestamp in seconds, presence flags, and the pose and both hands
+# as float32 (x, y, z) landmarks, zero where MediaPipe saw nothing. Hands are stored in
+# the slot MediaPipe's handedness put them in. Fixed-size records let a whole log be
+# memory-mapped as one structured array.
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("present", "u1"),
+    ("pose", "<f4", (POSE_LANDMARKS, 3)),
+    ("left_hand", "<f4", (HAND_LANDMARKS, 3)),
+    ("right_hand", "<f4", (HAND_LANDMARKS, 3)),
+])
+
+class LandmarkRecorder:
+    """Appends each frame's hand and pose landmarks to a landmark log."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(LOG_MAGIC + LOG_VERSION.to_bytes(2, "little"))
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        self.frames = 0
+
+    def write(self, timestamp, left_hand_keypoints, right_hand_keypoints, pose_keypoints):
+        record = self._record[0]
+        record["timestamp"] = timestamp
+        record["pose"] = pose_keypoints
+        record["left_hand"] = left_hand_keypoints
+        record["right_hand"] = right_hand_keypoints
+        record["present"] = (
+            POSE_PRESENT * bool(record["pose"].any())
+            | LEFT_HAND_PRESENT * bool(record["left_hand"].any())
+            | RIGHT_HAND_PRESENT * bool(record["right_hand"].any())
+        )
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_log(path):
+    """Memory-map a landmark log as a structured array of RECORD_DTYPE records."""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if header[:len(LOG_MAGIC)] != LOG_MAGIC:
+        raise ValueError(f"{path} is not a landmark log")
+    version = int.from_bytes(header[len(LOG_MAGIC):], "little")
+    if version != LOG_VERSION:
+        raise ValueError(f"{path} has unsupported landmark log version {version}")
+
+    # A partly written last record (e.g. the recorder was killed) is ignored
+    frames = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if not frames:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(frames,))
+
+def load_log_landmarks(path):
+    """Return the (left_hand, right_hand, pose) arrays of a landmark log, like refeaturize.load_landmarks."""
+    records = read_log(path)
+    return (
+        np.asarray(records["left_hand"], dtype=np.float64),
+        np.asarray(records["right_hand"], dtype=np.float64),
+        np.asarray(records["pose"], dtype=np.float64),
+    )
+
+def replay(path, recognizer=None, history=None, speed=None, on_change=None):
+    """Feed a landmark log through feature extraction, matching and the gesture history.
+
+    With speed=None frames are replayed as fast as possible; otherwise at speed times the
+    recorded rate. on_change is called with the transcript text whenever it changes.
+    Returns (history, frames, elapsed seconds).
+    """
+    from pipeline import KeypointRecognizer  # Not needed just to read logs, e.g. from refeaturize
+
+    records = read_log(path)
+    recognizer = recognizer or KeypointRecognizer()
+    history = history or GestureHistory()
+
+    start = time.perf_counter()
+    for record in records:
+        if speed:
+            delay = (record["timestamp"] - records["timestamp"][0]) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        gesture_match, dynamic_match = recognizer.recognize(record["left_hand"], record["right_hand"], record["pose"])
+        if history.handle_match(gesture_match, dynamic_match, recognizer.candidates) and on_change:
+            on_change(history.transcript.text)
+
+    return history, len(records), time.perf_counter() - start
+
+if __name__ == "__main__":
+    from dynamic_detection import DynamicGestureRecognizer, load_templates
+    from pipeline import KeypointRecognizer, StageTimer
+    from static_detection import get_gesture_store
+
+    parser = argparse.ArgumentParser(description="Replay recorded landmark logs through gesture recognition without a camera.")
+    parser.add_argument("logs", nargs="+", help=f"Landmark logs ({LOG_EXTENSION}) written by main.py --record")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="Replay at this multiple of the recorded rate (default: as fast as possible)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final transcript and timings")
+    args = parser.parse_args()
+
+    templates = load_templates(get_gesture_store())
+    for path in args.logs:
+        timer = StageTimer()
+        recognizer = KeypointRecognizer(timer, dynamic_recognizer=DynamicGestureRecognizer(templates) if templates else None)
+        history, frames, elapsed = replay(path, recognizer, speed=args.speed,
+                                          on_change=None if args.quiet else print)
+        print(f"{path}: {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.0f} fps) | {timer.report()}")
+        print(f"Transcript: {history.transcript.text}")
@@ -0,0 +1,62 @@
+import numpy as np
+from feature_extraction import HAND_LANDMARKS, POSE_LANDMARKS
+
+LEFT = 0
+RIGHT = 1
+HANDEDNESS_SLOTS = {"Left": LEFT, "Right": RIGHT}
+
+def _fill(values, offset, landmarks):
+    """Write (x, y, z) of each landmark into a flat float32 memoryview, starting at offset."""
+    for landmark in landmarks:
+        values[offset] = landmark.x
+        values[offset + 1] = landmark.y
+        values[offset + 2] = landmark.z
+        offset += 3
+
+class LandmarkBuffer:
+    """Landmark arrays for one stream, allocated once and filled in place from MediaPipe results.
+
+    hands is a (2, 21, 3) float32 array with the left hand first and pose a (33, 3) float32
+    array, hands in the slot MediaPipe's handedness puts them in and zero where nothing was
+    detected. The feature extractor reads them directly, so no per-frame tuple lists are built.
+    """
+
+    def __init__(self):
+        self.hands = np.zeros((2, HAND_LANDMARKS, 3), dtype=np.float32)
+        self.pose = np.zeros((POSE_LANDMARKS, 3), dtype=np.float32)
+        self.hand_present = np.zeros(2, dtype=bool)
+        self.pose_present = False
+        self._hand_values = memoryview(self.hands.reshape(-1))
+        self._pose_values = memoryview(self.pose.reshape(-1))
+        self._filled_pose = None
+
+    @property
+    def left_hand(self):
+        return self.hands[LEFT]
+
+    @property
+    def right_hand(self):
+        return self.hands[RIGHT]
+
+    def fill(self, results_pose, results_hands):
+        # The detector reuses the same pose result between pose refreshes; it is only copied once
+        if results_pose is not self._filled_pose:
+            self._filled_pose = results_pose
+            self.pose_present = bool(results_pose is not None and results_pose.pose_landmarks)
+            if self.pose_present:
+                _fill(self._pose_values, 0, results_pose.pose_landmarks.landmark)
+            else:
+                self.pose[:] = 0
+
+        present = [False, False]
+        if results_hands.multi_hand_landmarks:
+            for hand_landmarks, handedness in zip(results_hands.multi_hand_landmarks, results_hands.multi_handedness):
+                slot = HANDEDNESS_SLOTS.get(handedness.classification[0].label)
+                if slot is not None:
+                    _fill(self._hand_values, slot * HAND_LANDMARKS * 3, hand_landmarks.landmark)
+                    present[slot] = True
+
+        for slot, found in enumerate(present):
+            if not found and self.hand_present[slot]:
+                self.hands[slot] = 0
+            self.hand_present[slot] = found
@@ -1,39 +1,34 @@
+import argparse
 import cv2
-import mediapipe as mp
-import numpy as np
+import queue
+import time
 import tkinter as tk
-from PIL import Image, ImageTk
-from collections import deque, Counter
-from feature_extraction import process_keypoints
-from static_detection import check_gesture_match
-
-GESTURE_COMBINATIONS = {
-    ("mabuti", "kamusta"): "magandang umaga",
-    ("salamat1", "resting"): "salamat",
-    ("mabuti", "c"): "magandang gabi"
-}
-
-EXCLUDED_WORDS = {"resting", "mabuti", "salamat1"}
-FILTERED_HISTORY_LIMIT = 10
-GESTURE_HOLD_THRESHOLD = 5  # Number of frames the gesture must be held
-
-def process_filtered_history(raw_history):
-    filtered_history = deque(maxlen=FILTERED_HISTORY_LIMIT)
-    temp_sequence = deque(maxlen=2)
-    for gesture in raw_history:
-        temp_sequence.append(gesture)
-        gesture_tuple = tuple(temp_sequence)
-        if gesture_tuple in GESTURE_COMBINATIONS:
-            combined_word = GESTURE_COMBINATIONS[gesture_tuple]
-            filtered_history.append(combined_word)
-            temp_sequence.clear()
-        else:
-            if gesture not in EXCLUDED_WORDS:
-                filtered_history.append(gesture)
-    return filtered_history
+from gesture_history import GESTURE_HOLD_THRESHOLD, GestureHistory
+from landmark_log import LandmarkRecorder
+from metrics import MetricsServer, write_metrics
+from pipeline import AdaptiveScheduler, CaptureThread, FrameQueue, GestureRecognizer, InferenceWorker, StageTimer
+from preview import PREVIEW_FPS, PREVIEW_WIDTH, PreviewRenderer
+from dynamic_detection import DynamicGestureRecognizer, load_templates
+from static_detection import MATCHER_BACKEND, MATCHER_BACKENDS, MatchSmoother, get_gesture_store, refresh_gesture_index, set_matcher_backend
+
+TIMING_REPORT_INTERVAL = 5  # Seconds between per-stage timing reports
+OVERLAY_REFRESH_INTERVAL = 1  # Seconds between updates of the on-screen metrics overlay
+POSE_REFRESH_INTERVAL = 5  # Run pose at least every N frames, reusing the shoulders in between
+POSE_MOTION_THRESHOLD = 0.05  # ...or as soon as a wrist moves this far (normalized image coordinates)
+SMOOTHING_WINDOW = 5  # Frames of matches the smoothed match is voted over
+SMOOTHING_HYSTERESIS = 0  # Extra votes a new match needs before it replaces the current one
+IDLE_FPS = 5  # Inference rate while nobody has shown a hand for IDLE_AFTER seconds
+IDLE_SCALE = 0.5  # Frames are downscaled by this much while idle
+IDLE_AFTER = 2.0
+LATENCY_TARGET = 0.15  # Seconds from capture to result; frames are spaced out while above it
+CPU_CEILING = None  # Cores the process may use while active (e.g. 1.0), None for no limit
+HAND_ROI = False  # Run hand detection on crops around the hands instead of the full frame
+STORE_POLL_INTERVAL = 2  # Seconds between checks for gestures added or deleted while running
+UI_POLL_INTERVAL = 10  # Milliseconds between UI updates while active
 
 class GestureApp:
-    def __init__(self, root):
+    def __init__(self, root, record_path=None, metrics_port=None, metrics_file=None, scheduler=None, hand_roi=HAND_ROI,
+                 preview_fps=PREVIEW_FPS, preview_width=PREVIEW_WIDTH, headless=False):
         self.root = root
         self.root.title("Gesture Recognition UI")
 
@@ -44,8 +39,11 @@ class GestureApp:
         self.textbox.tag_configure("center", justify="center")
         self.textbox.pack(pady=5)
 
-        self.canvas = tk.Label(root)
-        self.canvas.pack(pady=10)
+        # Headless runs have no video preview at all; nothing is drawn or converted for Tk
+        self.canvas = None
+        if not headless:
+            self.canvas = tk.Label(root)
+            self.canvas.pack(pady=10)
 
         self.speech_label = tk.Label(root, text="Speech to Text", font=("Arial", 14))
         self.speech_label.pack(pady=5)
@@ -56,96 +54,189 @@ class GestureApp:
         button_frame = tk.Frame(root)
         button_frame.pack(pady=5)
 
-        self.speech_button = tk.Button(button_frame, text="Start Speech to Text", font=("Arial", 12))
+        self.speech_button = tk.Button(button_frame, text="Start Speech to Text", font=("Arial", 12), command=self.toggle_speech)
         self.speech_button.pack(side=tk.LEFT, padx=5)
 
         self.reset_button = tk.Button(button_frame, text="Reset History", font=("Arial", 12), command=self.reset_history)
         self.reset_button.pack(side=tk.LEFT, padx=5)
 
+        self.history = GestureHistory(GESTURE_HOLD_THRESHOLD)
+
+        # Capture -> inference -> UI, connected by bounded queues that drop the oldest frame
+        self.timer = StageTimer()
+        self.frames = FrameQueue(maxsize=1)
+        self.results = FrameQueue(maxsize=GESTURE_HOLD_THRESHOLD)
         self.cap = cv2.VideoCapture(0)
-        self.raw_gesture_history = deque(maxlen=10)
-        self.filtered_gesture_history = deque(maxlen=FILTERED_HISTORY_LIMIT)
-        self.gesture_counter = Counter()
-        
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_pose = mp.solutions.pose
-        self.mp_hands = mp.solutions.hands
-
-        self.pose = self.mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-        self.hands = self.mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-        self.current_sign = ""
+        templates = load_templates(get_gesture_store())
+        self.recognizer = GestureRecognizer(self.timer, POSE_REFRESH_INTERVAL, POSE_MOTION_THRESHOLD,
+                                            MatchSmoother(SMOOTHING_WINDOW, SMOOTHING_HYSTERESIS),
+                                            DynamicGestureRecognizer(templates) if templates else None,
+                                            LandmarkRecorder(record_path) if record_path else None,
+                                            hand_roi)
+        self.scheduler = scheduler or AdaptiveScheduler(IDLE_FPS, IDLE_SCALE, IDLE_AFTER, LATENCY_TARGET, CPU_CEILING)
+        self.preview = None if headless else PreviewRenderer(self.canvas, self.timer, preview_fps, preview_width)
+        self.capture_thread = CaptureThread(self.cap, self.frames, self.timer, scheduler=self.scheduler)
+        self.inference_worker = InferenceWorker(self.recognizer, self.frames, self.results, self.scheduler)
+        self.capture_thread.start()
+        self.inference_worker.start()
+        self.last_timing_report = time.perf_counter()
+        self.last_store_check = time.perf_counter()
+
+        # Metrics: an overlay on the video (toggled with F2), the periodic report, and optionally
+        # a local HTTP endpoint and/or a JSON file rewritten at every report
+        self.show_overlay = True
+        self.overlay_text = ""
+        self.last_overlay_update = time.perf_counter()
+        self.overlay_processed = 0
+        self.root.bind("<F2>", lambda event: setattr(self, "show_overlay", not self.show_overlay))
+        self.metrics_file = metrics_file
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer({"main": self.timer}, metrics_port)
+            self.metrics_server.start()
+
+        # Speech runs on its own thread; transcripts come back through this queue
+        self.speech_results = queue.Queue()
+        self.speech_thread = None
+        self.speech_final_text = ""
+        self.speech_interim_text = ""
+
         self.update_frame()
 
+    def toggle_speech(self):
+        if self.speech_thread is not None and self.speech_thread.is_alive():
+            self.speech_thread.stop()
+            self.speech_thread = None
+            self.speech_button.configure(text="Start Speech to Text")
+        else:
+            from speech import SpeechRecognitionThread  # Only loaded once speech is first used
+
+            self.speech_thread = SpeechRecognitionThread(self.speech_results)
+            self.speech_thread.start()
+            self.speech_button.configure(text="Stop Speech to Text")
+
+    def update_speech(self):
+        changed = False
+        while True:
+            try:
+                transcript, is_final = self.speech_results.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if is_final:
+                self.speech_final_text += transcript.strip() + " "
+                self.speech_interim_text = ""
+            else:
+                self.speech_interim_text = transcript
+
+        if changed:
+            self.speech_textbox.delete("1.0", tk.END)
+            self.speech_textbox.insert(tk.END, self.speech_final_text + self.speech_interim_text)
+            self.speech_textbox.see(tk.END)
+
+        if self.speech_thread is not None and not self.speech_thread.is_alive():
+            self.speech_thread = None  # Stopped by itself, e.g. after hearing "exit"
+            self.speech_button.configure(text="Start Speech to Text")
+
     def reset_history(self):
-        self.raw_gesture_history.clear()
-        self.filtered_gesture_history.clear()
+        self.history.clear()
         self.textbox.delete("1.0", tk.END)
-        self.gesture_counter.clear()
 
-    def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            self.root.after(10, self.update_frame)
+    def show_transcript(self):
+        self.textbox.delete("1.0", tk.END)
+        self.textbox.insert(tk.END, self.history.transcript.text)
+        self.textbox.tag_add("center", "1.0", "end")
+
+    def update_overlay(self):
+        now = time.perf_counter()
+        processed = self.timer.counters.get("processed", 0)
+        fps = (processed - self.overlay_processed) / (now - self.last_overlay_update)
+        self.overlay_processed = processed
+        self.last_overlay_update = now
+        self.overlay_text = (
+            f"{fps:.0f} fps  latency p50 {self.timer.percentile('latency', 50) * 1000:.0f}ms "
+            f"p99 {self.timer.percentile('latency', 99) * 1000:.0f}ms  dropped {self.timer.counters.get('dropped', 0)}"
+            + ("  idle" if self.scheduler.idle else "")
+        )
+
+    def ui_poll_interval(self):
+        # No point polling much faster than results can arrive
+        return max(UI_POLL_INTERVAL, int(self.scheduler.frame_interval * 500))
+
+    def reload_gestures(self):
+        """Swap in gestures recorded or deleted (e.g. by static_data_collection) since the last check."""
+        if not refresh_gesture_index():
             return
+        templates = load_templates(get_gesture_store())
+        self.recognizer.dynamic_recognizer = DynamicGestureRecognizer(templates) if templates else None
+        print(f"Reloaded gestures ({len(get_gesture_store())} in store)")
 
-        frame = cv2.flip(frame, 1)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results_pose = self.pose.process(frame_rgb)
-        results_hands = self.hands.process(frame_rgb)
-
-        left_hand_keypoints = [(0, 0, 0)] * 21
-        right_hand_keypoints = [(0, 0, 0)] * 21
-        pose_keypoints = [(0, 0, 0)] * 33
-
-        if results_pose.pose_landmarks:
-            self.mp_drawing.draw_landmarks(frame_rgb, results_pose.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
-            pose_keypoints = [(landmark.x, landmark.y, landmark.z) for landmark in results_pose.pose_landmarks.landmark]
-
-        if results_hands.multi_hand_landmarks:
-            for hand_landmarks, handedness in zip(results_hands.multi_hand_landmarks, results_hands.multi_handedness):
-                self.mp_drawing.draw_landmarks(frame_rgb, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-                hand_keypoints = [(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks.landmark]
-                if handedness.classification[0].label == "Left":
-                    left_hand_keypoints = hand_keypoints
-                elif handedness.classification[0].label == "Right":
-                    right_hand_keypoints = hand_keypoints
-
-        flexion, position, rotation = process_keypoints(left_hand_keypoints, right_hand_keypoints, pose_keypoints)
-        gesture_match = check_gesture_match(flexion, position, rotation)
-
-        if gesture_match and gesture_match != "No Match":
-            self.gesture_counter[gesture_match] += 1
-            if self.gesture_counter[gesture_match] >= GESTURE_HOLD_THRESHOLD:
-                if not self.raw_gesture_history or self.raw_gesture_history[-1] != gesture_match:
-                    self.raw_gesture_history.append(gesture_match)
-                    self.filtered_gesture_history = process_filtered_history(self.raw_gesture_history)
-                    self.current_sign = gesture_match
-                self.gesture_counter.clear()
-        else:
-            self.gesture_counter.clear()
+    def update_frame(self):
+        self.update_speech()
 
-        filtered_history_text = "  ".join(self.filtered_gesture_history)
-        self.textbox.delete("1.0", tk.END)
-        self.textbox.insert(tk.END, filtered_history_text)
-        self.textbox.tag_add("center", "1.0", "end")
+        if time.perf_counter() - self.last_store_check >= STORE_POLL_INTERVAL:
+            self.reload_gestures()
+            self.last_store_check = time.perf_counter()
 
-        cv2.putText(frame_rgb, f'{self.current_sign}', (20, 20), cv2.FONT_HERSHEY_SIMPLEX, .5, (255, 255, 255), 1)
+        # Every inference result counts towards the hold threshold, but only the latest is drawn
+        results = self.results.drain()
+        if not results:
+            self.root.after(self.ui_poll_interval(), self.update_frame)
+            return
+
+        for result in results:
+            if self.history.handle_match(result.gesture_match, result.dynamic_match, result.candidates):
+                self.show_transcript()  # The textbox is only touched when its text changes
 
-        img = Image.fromarray(frame_rgb)
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.canvas.imgtk = imgtk
-        self.canvas.configure(image=imgtk)
+        # The preview runs at its own, lower rate; results in between are matched but not drawn
+        if self.preview is not None and self.preview.due():
+            if time.perf_counter() - self.last_overlay_update >= OVERLAY_REFRESH_INTERVAL:
+                self.update_overlay()
+            self.preview.render(results[-1], f'{self.history.current_sign}', self.overlay_text if self.show_overlay else None)
 
-        self.root.after(10, self.update_frame)
+        if time.perf_counter() - self.last_timing_report >= TIMING_REPORT_INTERVAL:
+            print(self.timer.report())
+            if self.metrics_file:
+                write_metrics(self.metrics_file, {"main": self.timer})
+            self.last_timing_report = time.perf_counter()
+
+        self.root.after(self.ui_poll_interval(), self.update_frame)
 
     def on_close(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.speech_thread is not None:
+            self.speech_thread.stop()
+            self.speech_thread.join(timeout=2)
+        self.capture_thread.stop()
+        self.inference_worker.stop()
+        self.capture_thread.join()
+        self.inference_worker.join()
+        self.recognizer.close()
         self.cap.release()
         cv2.destroyAllWindows()
         self.root.quit()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Translate signs and speech to text.")
+    parser.add_argument("--record", help="Also write every frame's landmarks to this log, for replay with landmark_log.py")
+    parser.add_argument("--metrics-port", type=int, help="Serve /metrics and /metrics.json on this local port")
+    parser.add_argument("--metrics-file", help="Rewrite this JSON file with the metrics at every timing report")
+    parser.add_argument("--idle-fps", type=float, default=IDLE_FPS, help="Inference rate while no hands are seen")
+    parser.add_argument("--latency-target", type=float, default=LATENCY_TARGET, help="Capture-to-result latency goal in seconds")
+    parser.add_argument("--cpu-ceiling", type=float, default=CPU_CEILING, help="Cores the process may use, e.g. 1.0")
+    parser.add_argument("--hand-roi", action="store_true", default=HAND_ROI,
+                        help="Detect hands on crops around the wrists instead of the whole frame")
+    parser.add_argument("--preview-fps", type=float, default=PREVIEW_FPS, help="Frame rate of the video preview")
+    parser.add_argument("--preview-width", type=int, default=PREVIEW_WIDTH, help="Width the video preview is shrunk to")
+    parser.add_argument("--headless", action="store_true", help="Run without the video preview, only the text boxes")
+    parser.add_argument("--matcher", choices=MATCHER_BACKENDS, default=MATCHER_BACKEND, help="Static gesture matcher")
+    args = parser.parse_args()
+    set_matcher_backend(args.matcher)
+
     root = tk.Tk()
-    app = GestureApp(root)
+    scheduler = AdaptiveScheduler(args.idle_fps, IDLE_SCALE, IDLE_AFTER, args.latency_target, args.cpu_ceiling)
+    app = GestureApp(root, args.record, args.metrics_port, args.metrics_file, scheduler, args.hand_roi,
+                     args.preview_fps, args.preview_width, args.headless)
     root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
@@ -0,0 +1,195 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from feature_extraction import FEATURE_SIZE, FEATURE_SLICES
+from gesture_store import GESTURE_STORE, open_store
+from static_detection import GestureIndex, NearestNeighborIndex, compute_feature_ranges, threshold_scale, thresholds
+from tune_thresholds import overlapping_ranges
+
+# Why a sample is flagged. A sample only gets the first reason that applies.
+KEPT = 0
+INCOMPLETE = 1  # Lacks a feature most of its gesture's samples have, which drops it from the whole range
+EMPTY = 2  # Nothing detected (every feature zero), in a gesture whose samples mostly show something
+DROPOUT = 3  # A hand most of its gesture's samples show is missing (all-zero flexion)
+OUTLIER = 4  # Far outside the spread of its gesture's other samples
+DUPLICATE = 5  # Near-identical to an earlier sample of the same gesture
+REASONS = {INCOMPLETE: "incomplete", EMPTY: "empty", DROPOUT: "dropout", OUTLIER: "outlier", DUPLICATE: "duplicate"}
+
+MAJORITY = 0.5  # A feature or hand is expected once at least this fraction of a gesture's samples have it
+OUTLIER_Z = 10.0  # Robust z-score (median / MAD) beyond which a value is an outlier; high, as any of 26 can trip it
+MIN_SPREAD = 0.1  # ...with the spread never taken below this fraction of the threshold
+DEDUP_TOLERANCE = 0.05  # Samples on the same grid of this fraction of the thresholds are duplicates
+MIN_SAMPLES = 2  # Gestures that would keep fewer samples are left alone
+TASK_CHUNKSIZE = 4  # Gestures handed to a worker process at a time
+HAND_FLEXIONS = 9
+ANGLES = FEATURE_SLICES["rotation"]
+
+def _centred_angles(values, reference):
+    """values with the rotation angles re-centred on the reference rows' circular mean, wrapped to ±180.
+
+    A gesture held around ±180 degrees would otherwise look split into two far-apart clusters.
+    """
+    radians = np.radians(reference[:, ANGLES])
+    centre = np.degrees(np.arctan2(np.sin(radians).mean(axis=0), np.cos(radians).mean(axis=0)))
+    values = values.copy()
+    values[:, ANGLES] = (values[:, ANGLES] - centre + 180) % 360 - 180
+    return values
+
+def flag_samples(samples, scale, outlier_z=OUTLIER_Z, dedup_tolerance=DEDUP_TOLERANCE):
+    """Return a reason code per sample of one gesture's (samples, FEATURE_SIZE) array, KEPT for good ones."""
+    samples = np.asarray(samples, dtype=np.float64)
+    reasons = np.zeros(len(samples), dtype=np.uint8)
+
+    def flag(condition, reason):
+        reasons[(reasons == KEPT) & condition] = reason
+
+    recorded = ~np.isnan(samples)
+    expected = np.zeros(samples.shape[1], dtype=bool)
+    for columns in FEATURE_SLICES.values():
+        if recorded[:, columns].all(axis=1).mean() >= MAJORITY:
+            expected[columns] = True
+    flag(~recorded[:, expected].all(axis=1), INCOMPLETE)
+
+    values = np.where(recorded, samples, 0.0)
+    empty = ~values.any(axis=1)
+    if empty[reasons == KEPT].mean() < MAJORITY:  # A gesture like "resting" is meant to show no hands
+        flag(empty, EMPTY)
+
+    if expected[FEATURE_SLICES["flexion"]].all():
+        for hand in range(2):
+            seen = values[:, hand * HAND_FLEXIONS:(hand + 1) * HAND_FLEXIONS].any(axis=1)
+            if (reasons == KEPT).any() and seen[reasons == KEPT].mean() >= MAJORITY:
+                flag(~seen, DROPOUT)
+
+    kept = reasons == KEPT
+    if kept.sum() >= MIN_SAMPLES:
+        centred = _centred_angles(values, values[kept])[:, expected]
+        median = np.median(centred[kept], axis=0)
+        spread = np.maximum(1.4826 * np.median(np.abs(centred[kept] - median), axis=0), MIN_SPREAD * scale[expected])
+        flag((np.abs(centred - median) / spread > outlier_z).any(axis=1), OUTLIER)
+
+    kept = np.flatnonzero(reasons == KEPT)
+    grid = np.where(recorded[kept], np.round(values[kept] / (dedup_tolerance * scale)), np.inf)
+    _, first = np.unique(grid, axis=0, return_index=True)
+    duplicate = np.ones(len(kept), dtype=bool)
+    duplicate[first] = False
+    reasons[kept[duplicate]] = DUPLICATE
+    return reasons
+
+def check_gesture_file(path, scale, outlier_z, dedup_tolerance):
+    """Worker: memory-map one gesture file and flag its samples, so only the reasons travel back."""
+    return flag_samples(np.load(path, mmap_mode="r"), scale, outlier_z, dedup_tolerance)
+
+def flag_store(store, workers=None, outlier_z=OUTLIER_Z, dedup_tolerance=DEDUP_TOLERANCE):
+    """Flag every static gesture's samples across a process pool; returns {name: reason codes}."""
+    names = [name for name, samples in store.items() if len(samples)]
+    paths = [os.path.join(store.path, store.header["gestures"][name]["file"]) for name in names]
+    count = len(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reasons = executor.map(check_gesture_file, paths, [threshold_scale(thresholds)] * count, [outlier_z] * count,
+                               [dedup_tolerance] * count, chunksize=TASK_CHUNKSIZE)
+        return dict(zip(names, reasons))
+
+def cleaned_samples(store, flags):
+    """{name: samples} with the flagged samples removed, leaving gestures that would get too small unchanged."""
+    cleaned = {}
+    for name, reasons in flags.items():
+        samples = np.asarray(store.samples(name))
+        kept = reasons == KEPT
+        cleaned[name] = samples[kept] if kept.sum() >= MIN_SAMPLES else samples
+    return cleaned
+
+def orphan_files(store):
+    """Gesture files in the store that the header no longer references (e.g. left behind on Windows).
+
+    Only numbered .npy files older than the header's next_id are considered, so a file another
+    process is adding right now is never one of them; header.json, the matcher cache and the
+    tuned thresholds are never touched.
+    """
+    referenced = {entry["file"] for entry in store.header["gestures"].values()}
+    orphans = []
+    for file_name in sorted(os.listdir(store.path)):
+        stem, extension = os.path.splitext(file_name)
+        if extension == ".npy" and stem.isdigit() and int(stem) < store.header["next_id"] and file_name not in referenced:
+            orphans.append(file_name)
+    return orphans
+
+def range_tightness(gestures):
+    """Per gesture: mean range width over the features kept in its range, in threshold units, and those features."""
+    scale = threshold_scale(thresholds)
+    tightness = {}
+    for name, samples in gestures.items():
+        feature_ranges = compute_feature_ranges(np.asarray(samples))
+        widths = [(feature_range["max"] - feature_range["min"]) / scale[FEATURE_SLICES[feature]]
+                  for feature, feature_range in feature_ranges.items()]
+        tightness[name] = (float(np.concatenate(widths).mean()) if widths else 0.0, sorted(feature_ranges))
+    return tightness
+
+def matcher_stats(gestures, queries, batch_size=256):
+    """Overlapping range pairs and per-frame matching time of both matchers built from {name: samples}."""
+    range_index = GestureIndex({name: compute_feature_ranges(np.asarray(samples)) for name, samples in gestures.items()},
+                               thresholds)
+    knn_index = NearestNeighborIndex(gestures, thresholds)
+    stats = {"overlapping_pairs": int(overlapping_ranges(range_index).sum() // 2)}
+    for label, index in (("range", range_index), ("knn", knn_index)):
+        start = time.perf_counter()
+        for offset in range(0, len(queries), batch_size):
+            index.match_batch(queries[offset:offset + batch_size])
+        stats[label] = (time.perf_counter() - start) / max(len(queries), 1)
+    return stats
+
+def format_report(flags, before, after):
+    lines = [f"{'gesture':<16}{'samples':>8}{'kept':>6}  " + " ".join(f"{reason:>10}" for reason in REASONS.values())
+             + f"{'width':>14}  features"]
+    for name, reasons in flags.items():
+        counts = np.bincount(reasons, minlength=len(REASONS) + 1)
+        (width_before, features_before), (width_after, features_after) = before[name], after[name]
+        features = ",".join(features_after)
+        if features_after != features_before:
+            features = ",".join(features_before) + " -> " + features
+        lines.append(f"{name:<16}{len(reasons):>8}{counts[KEPT]:>6}  " + " ".join(f"{count:>10}" for count in counts[1:])
+                     + f"{width_before:>7.2f}->{width_after:<5.2f}  {features}")
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag degenerate, outlier and duplicate gesture samples and compact the store.")
+    parser.add_argument("store_path", nargs="?", default=GESTURE_STORE)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--outlier-z", type=float, default=OUTLIER_Z)
+    parser.add_argument("--dedup-tolerance", type=float, default=DEDUP_TOLERANCE,
+                        help="Grid size, as a fraction of the thresholds, below which samples count as duplicates")
+    parser.add_argument("--apply", action="store_true",
+                        help="Rewrite gestures without their flagged samples and delete orphaned files (default: only report)")
+    args = parser.parse_args()
+
+    store = open_store(args.store_path)
+    start = time.perf_counter()
+    flags = flag_store(store, args.workers, args.outlier_z, args.dedup_tolerance)
+    elapsed = time.perf_counter() - start
+    original = {name: np.asarray(store.samples(name)) for name in flags}
+    cleaned = cleaned_samples(store, flags)
+    orphans = orphan_files(store)
+
+    print("\n".join(format_report(flags, range_tightness(original), range_tightness(cleaned))))
+    total = sum(len(reasons) for reasons in flags.values())
+    removed = total - sum(len(samples) for samples in cleaned.values())
+    print(f"Checked {total} samples of {len(flags)} gestures in {elapsed:.2f}s; {removed} would be removed, "
+          f"{len(orphans)} orphaned files")
+
+    queries = np.concatenate(list(original.values()) or [np.empty((0, FEATURE_SIZE))])
+    queries = np.nan_to_num(queries)  # Zero unrecorded features, like benchmark.recorded_features, so every sample is timed
+    stats_before, stats_after = matcher_stats(original, queries), matcher_stats(cleaned, queries)
+    print(f"Overlapping range pairs: {stats_before['overlapping_pairs']} -> {stats_after['overlapping_pairs']}")
+    for label in ("range", "knn"):
+        print(f"{label} matcher: {stats_before[label] * 1e6:.1f} -> {stats_after[label] * 1e6:.1f} us/frame")
+
+    if args.apply:
+        for name, samples in cleaned.items():
+            if len(samples) != len(original[name]):
+                store.add_gesture(name, samples)  # Written under a new file; the old one is removed
+        orphans = orphan_files(store)
+        for file_name in orphans:
+            os.remove(os.path.join(store.path, file_name))
+        print(f"Removed {removed} samples and {len(orphans)} orphaned files; rerun tune_thresholds.py --write for the changed gestures")
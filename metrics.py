@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bucket bounds in seconds: 0.1 ms up to ~26 s in steps of 2 ** 0.25 (about 19%)
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** (i / 4) for i in range(73))
+METRICS_PREFIX = "dmt"
+
+class Histogram:
+    """Counts of observations in fixed, logarithmically spaced buckets.
+
+    Recording is a bisect and two additions, so it can stay on in production. Percentiles
+    are read back as the upper bound of the bucket they fall in. Not thread-safe by itself;
+    StageTimer guards its histograms with its own lock.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket holds everything above the largest bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[min(bucket, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": list(self.counts),
+        }
+
+def format_prometheus(timers):
+    """Render {stream label: StageTimer} in the Prometheus text exposition format."""
+    lines = [f"# TYPE {METRICS_PREFIX}_stage_seconds histogram"]
+    counter_lines = [f"# TYPE {METRICS_PREFIX}_events_total counter"]
+    for label, timer in timers.items():
+        snapshot = timer.snapshot()
+        for stage, histogram in snapshot["stages"].items():
+            labels = f'stream="{label}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                cumulative += count
+                lines.append(f'{METRICS_PREFIX}_stage_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{METRICS_PREFIX}_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{METRICS_PREFIX}_stage_seconds_sum{{{labels}}} {histogram['sum']:.9g}")
+            lines.append(f"{METRICS_PREFIX}_stage_seconds_count{{{labels}}} {histogram['count']}")
+        for event, value in snapshot["counters"].items():
+            counter_lines.append(f'{METRICS_PREFIX}_events_total{{stream="{label}",event="{event}"}} {value}')
+    return "\n".join(lines + counter_lines) + "\n"
+
+def metrics_json(timers):
+    return json.dumps({label: timer.snapshot() for label, timer in timers.items()})
+
+def write_metrics(path, timers):
+    """Atomically write a JSON snapshot of every timer, for scraping from a file."""
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as f:
+        f.write(metrics_json(timers))
+    os.replace(temporary_path, path)
+
+class MetricsServer(threading.Thread):
+    """Serves /metrics (Prometheus text) and /metrics.json on a local port from a daemon thread."""
+
+    def __init__(self, timers, port, host="127.0.0.1"):
+        super().__init__(daemon=True)
+        self.timers = timers
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = format_prometheus(server.timers), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = metrics_json(server.timers), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Scrapes would otherwise print a line each
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def run(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        if self.is_alive():
+            self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,557 @@
+import math
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import SimpleNamespace
+import numpy as np
+from feature_extraction import extract_features
+from landmarks import LandmarkBuffer
+from metrics import Histogram
+from static_detection import RANK_CANDIDATES, MatchSmoother, match_and_rank_features, match_features
+
+class FrameQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Queue an item; returns True if the oldest one had to be dropped for it."""
+        with self._condition:
+            dropped = len(self._items) == self._items.maxlen
+            if dropped:
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+            return dropped
+
+    def get(self, timeout=None):
+        """Wait for the oldest item; returns None on timeout or once the queue is closed."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._items or self.closed, timeout)
+            return self._items.popleft() if self._items else None
+
+    def drain(self):
+        """Return every queued item without waiting."""
+        with self._condition:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+class StageTimer:
+    """Per-stage timings (moving average plus a latency histogram) and event counters.
+
+    Cheap enough to leave on: recording is a lock, a bisect and a few additions.
+    """
+
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.averages = {}
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            previous = self.averages.get(stage)
+            self.averages[stage] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, event, amount=1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + amount
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def percentile(self, stage, q):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            return histogram.percentile(q) if histogram is not None else 0.0
+
+    def snapshot(self):
+        """Histograms and counters as plain dicts, for the metrics endpoints."""
+        with self._lock:
+            stages = {stage: dict(histogram.snapshot(), average=self.averages[stage])
+                      for stage, histogram in self.histograms.items()}
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def report(self):
+        with self._lock:
+            stages = " | ".join(
+                f"{stage} {seconds * 1000:.1f}ms (p99 {self.histograms[stage].percentile(99) * 1000:.1f})"
+                for stage, seconds in self.averages.items()
+            )
+            counters = " ".join(f"{event} {value}" for event, value in self.counters.items())
+        return f"{stages} | {counters}" if counters else stages
+
+class AdaptiveScheduler:
+    """Decides how often captured frames go to inference, and at what scale.
+
+    With no hands seen for idle_after seconds the pipeline idles at idle_fps on frames
+    downscaled by idle_scale; as soon as a hand shows up it runs at full rate and size.
+    While active, a controller adds delay between frames whenever latency is above
+    latency_target (seconds) or the process uses more than cpu_ceiling cores, and takes it
+    away again once there is room (multiplicative increase, additive decrease).
+    """
+
+    def __init__(self, idle_fps=5, idle_scale=0.5, idle_after=2.0, latency_target=None, cpu_ceiling=None,
+                 max_fps=None, cpu_check_interval=1.0):
+        self.idle_interval = 1 / idle_fps
+        self.idle_scale = idle_scale
+        self.idle_after = idle_after
+        self.latency_target = latency_target
+        self.cpu_ceiling = cpu_ceiling
+        self.min_interval = 1 / max_fps if max_fps else 0.0
+        self.cpu_check_interval = cpu_check_interval
+        self.throttle = 0.0  # Extra seconds between active frames
+        self.cpu_usage = 0.0  # Cores used over the last check interval
+        self._over_cpu = False
+        self._last_hands_at = time.perf_counter()
+        self._cpu_checked_at = (time.perf_counter(), time.process_time())
+
+    @property
+    def idle(self):
+        return time.perf_counter() - self._last_hands_at > self.idle_after
+
+    @property
+    def frame_interval(self):
+        if self.idle:
+            return max(self.idle_interval, self.min_interval + self.throttle)
+        return self.min_interval + self.throttle
+
+    @property
+    def scale(self):
+        return self.idle_scale if self.idle else 1.0
+
+    def _check_cpu(self, now):
+        checked_at, cpu_at = self._cpu_checked_at
+        if now - checked_at < self.cpu_check_interval:
+            return
+        cpu_now = time.process_time()
+        self.cpu_usage = (cpu_now - cpu_at) / (now - checked_at)
+        self._cpu_checked_at = (now, cpu_now)
+        self._over_cpu = self.cpu_ceiling is not None and self.cpu_usage > self.cpu_ceiling
+
+    def update(self, hands_detected, latency):
+        """Feed back one inference result: whether any hand was found, and its capture-to-result latency."""
+        now = time.perf_counter()
+        if hands_detected:
+            self._last_hands_at = now
+        self._check_cpu(now)
+
+        over_latency = self.latency_target is not None and latency > self.latency_target
+        if over_latency or self._over_cpu:
+            self.throttle = min(self.throttle * 1.5 + 0.005, self.idle_interval)
+        else:
+            self.throttle = max(self.throttle - 0.001, 0.0)
+
+class FrameResult:
+    def __init__(self, captured_at, frame_rgb, results_pose, results_hands, gesture_match, dynamic_match=None,
+                 candidates=None):
+        self.captured_at = captured_at
+        self.frame_rgb = frame_rgb
+        self.results_pose = results_pose
+        self.results_hands = results_hands
+        self.gesture_match = gesture_match
+        self.dynamic_match = dynamic_match  # Set on the frame a motion sign completes
+        self.candidates = candidates  # This frame's unsmoothed ranked static matches
+
+def _wrist_positions(results_hands):
+    if not results_hands.multi_hand_landmarks:
+        return {}
+    return {
+        handedness.classification[0].label: (hand_landmarks.landmark[0].x, hand_landmarks.landmark[0].y)
+        for hand_landmarks, handedness in zip(results_hands.multi_hand_landmarks, results_hands.multi_handedness)
+    }
+
+POSE_WRISTS = (15, 16)  # Pose landmark indices of the left and right wrist
+POSE_SHOULDERS = (11, 12)
+WRIST_VISIBILITY = 0.5  # Pose wrists less visible than this are not used to place a hand region
+POSE_ROI_SCALE = 1.2  # Side of a region placed on a pose wrist, in shoulder widths
+HAND_ROI_SCALE = 2.0  # Side of a region following a hand, relative to the hand's bounding box
+MIN_ROI_SIZE = 64  # Regions smaller than this many pixels are not worth cropping
+FULL_FRAME_INTERVAL = 30  # Search the whole frame at least every N frames to pick up hands the regions missed
+
+def _square_box(center_x, center_y, side, width, height):
+    """Square pixel box around a normalized center, clipped to the frame; None if too small."""
+    side = side * width
+    x0 = int(max(0, center_x * width - side / 2))
+    y0 = int(max(0, center_y * height - side / 2))
+    x1 = int(min(width, center_x * width + side / 2))
+    y1 = int(min(height, center_y * height + side / 2))
+    if x1 - x0 < MIN_ROI_SIZE or y1 - y0 < MIN_ROI_SIZE:
+        return None
+    return x0, y0, x1, y1
+
+def _hand_region(hand_landmarks, width, height):
+    """Normalized (center_x, center_y, side) of the square around a hand, side as a fraction of the width."""
+    xs = [landmark.x for landmark in hand_landmarks.landmark]
+    ys = [landmark.y for landmark in hand_landmarks.landmark]
+    side = max(max(xs) - min(xs), (max(ys) - min(ys)) * height / width) * HAND_ROI_SCALE
+    return (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2, side
+
+def _pose_wrist_box(results_pose, wrist, width, height):
+    if results_pose is None or not results_pose.pose_landmarks:
+        return None
+    landmarks = results_pose.pose_landmarks.landmark
+    if landmarks[wrist].visibility < WRIST_VISIBILITY:
+        return None
+    left_shoulder, right_shoulder = (landmarks[index] for index in POSE_SHOULDERS)
+    shoulder_width = math.hypot(left_shoulder.x - right_shoulder.x, (left_shoulder.y - right_shoulder.y) * height / width)
+    return _square_box(landmarks[wrist].x, landmarks[wrist].y, shoulder_width * POSE_ROI_SCALE, width, height)
+
+def _to_full_frame(hand_landmarks, box, width, height):
+    """Map landmarks normalized to a crop back to full-frame normalized coordinates, in place."""
+    x0, y0, x1, y1 = box
+    for landmark in hand_landmarks.landmark:
+        landmark.x = (x0 + landmark.x * (x1 - x0)) / width
+        landmark.y = (y0 + landmark.y * (y1 - y0)) / height
+        landmark.z = landmark.z * (x1 - x0) / width  # z is in the same units as x
+
+class HandRoiDetector:
+    """Runs MediaPipe Hands on small crops around where the hands are expected.
+
+    Each of two slots follows one hand: its region is the previous frame's hand box, or,
+    when it has lost its hand, a square on the matching pose wrist. Regions are kept in
+    normalized coordinates and only turned into pixels for the frame being cropped, since
+    the scheduler may shrink or restore frames in between. Each slot has its own
+    Hands instance so tracking is not confused by the other crop. Landmarks are mapped back
+    to full-frame coordinates, so results look like a normal full-frame Hands result. With
+    nothing to place a region on, and every full_frame_interval frames, the whole frame is
+    searched instead and the slots are seeded from what it finds.
+    """
+
+    def __init__(self, full_frame_hands, slot_hands, full_frame_interval=FULL_FRAME_INTERVAL):
+        self.full_frame_hands = full_frame_hands
+        self.slot_hands = slot_hands
+        self.full_frame_interval = full_frame_interval
+        self.regions = [None] * len(slot_hands)
+        self._frames_since_full = 0
+
+    def _process_full_frame(self, frame_rgb, width, height):
+        self._frames_since_full = 0
+        results_hands = self.full_frame_hands.process(frame_rgb)
+        self.regions = [None] * len(self.slot_hands)
+        for slot, hand_landmarks in enumerate((results_hands.multi_hand_landmarks or [])[:len(self.regions)]):
+            self.regions[slot] = _hand_region(hand_landmarks, width, height)
+        return results_hands
+
+    def process(self, frame_rgb, results_pose):
+        height, width = frame_rgb.shape[:2]
+        self._frames_since_full += 1
+        boxes = [
+            (region and _square_box(*region, width, height)) or _pose_wrist_box(results_pose, wrist, width, height)
+            for region, wrist in zip(self.regions, POSE_WRISTS)
+        ]
+        if self._frames_since_full >= self.full_frame_interval or not any(boxes):
+            return self._process_full_frame(frame_rgb, width, height)
+
+        found = {}  # handedness label -> (hand landmarks, handedness, slot)
+        self.regions = [None] * len(self.slot_hands)
+        for slot, box in enumerate(boxes):
+            if box is None:
+                continue
+            x0, y0, x1, y1 = box
+            results = self.slot_hands[slot].process(np.ascontiguousarray(frame_rgb[y0:y1, x0:x1]))
+            if not results.multi_hand_landmarks:
+                continue
+
+            hand_landmarks, handedness = results.multi_hand_landmarks[0], results.multi_handedness[0]
+            label = handedness.classification[0].label
+            if label in found:
+                # Both regions found the same hand: keep the more confident one
+                if found[label][1].classification[0].score >= handedness.classification[0].score:
+                    continue
+                self.regions[found[label][2]] = None
+
+            _to_full_frame(hand_landmarks, box, width, height)
+            found[label] = (hand_landmarks, handedness, slot)
+            self.regions[slot] = _hand_region(hand_landmarks, width, height)
+
+        return SimpleNamespace(
+            multi_hand_landmarks=[hand_landmarks for hand_landmarks, _, _ in found.values()] or None,
+            multi_handedness=[handedness for _, handedness, _ in found.values()] or None,
+        )
+
+    def close(self):
+        for hands in self.slot_hands:
+            hands.close()
+
+class LandmarkDetector:
+    """Runs MediaPipe Pose and Hands on the same frame concurrently.
+
+    Pose is only needed for the shoulders, which barely move while signing, so it can be
+    refreshed every pose_interval frames, or whenever a wrist has moved more than
+    pose_motion_threshold (in normalized image coordinates) since the last refresh.
+    In between, the cached pose result is reused.
+
+    With hand_roi, Hands runs on crops around the hands (see HandRoiDetector), placed
+    from the previous frame's hands or the cached pose wrists.
+    """
+
+    def __init__(self, timer=None, pose_interval=1, pose_motion_threshold=None, hand_roi=False):
+        import mediapipe as mp  # Only needed for live detection, not for replaying landmark logs
+
+        self.timer = timer or StageTimer()
+        self.pose_interval = pose_interval
+        self.pose_motion_threshold = pose_motion_threshold
+        self.pose = mp.solutions.pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self.hands = mp.solutions.hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self.hand_roi = None
+        if hand_roi:
+            self.hand_roi = HandRoiDetector(self.hands, [
+                mp.solutions.hands.Hands(max_num_hands=1, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+                for _ in POSE_WRISTS
+            ])
+        self._pose_executor = ThreadPoolExecutor(max_workers=1)
+        self._cached_pose = None
+        self._frames_since_pose = 0
+        self._wrists_at_pose = {}
+        self._last_wrists = {}
+
+    def _needs_pose(self):
+        if self._cached_pose is None or not self._cached_pose.pose_landmarks:
+            return True
+        if self._frames_since_pose >= self.pose_interval:
+            return True
+        if self.pose_motion_threshold is None:
+            return False
+        # Decided from the previous frame's hands, so pose can start before this frame's hands finish
+        if self._last_wrists.keys() != self._wrists_at_pose.keys():
+            return True
+        return any(
+            math.dist(self._last_wrists[label], self._wrists_at_pose[label]) > self.pose_motion_threshold
+            for label in self._last_wrists
+        )
+
+    def _process_pose(self, frame_rgb):
+        with self.timer.measure("pose"):
+            return self.pose.process(frame_rgb)
+
+    def process(self, frame_rgb):
+        """Return (results_pose, results_hands) for an RGB frame."""
+        pose_future = None
+        if self._needs_pose():
+            pose_future = self._pose_executor.submit(self._process_pose, frame_rgb)
+
+        with self.timer.measure("hands"):
+            if self.hand_roi is not None:
+                results_hands = self.hand_roi.process(frame_rgb, self._cached_pose)
+            else:
+                results_hands = self.hands.process(frame_rgb)
+
+        if pose_future is not None:
+            self._cached_pose = pose_future.result()
+            self._frames_since_pose = 0
+            self._wrists_at_pose = _wrist_positions(results_hands)
+        self._frames_since_pose += 1
+        self._last_wrists = _wrist_positions(results_hands)
+
+        return self._cached_pose, results_hands
+
+    def close(self):
+        self._pose_executor.shutdown()
+        self.pose.close()
+        self.hands.close()
+        if self.hand_roi is not None:
+            self.hand_roi.close()
+
+class KeypointRecognizer:
+    """Runs feature extraction and gesture matching on one frame's keypoints.
+
+    Each recognizer smooths its own matches, so several can run side by side. An optional
+    DynamicGestureRecognizer is fed the same features to spot motion signs. Unless rank is
+    0, the last frame's ranked Candidates are kept in candidates, for confidence-based holds.
+    """
+
+    def __init__(self, timer=None, smoother=None, dynamic_recognizer=None, rank=RANK_CANDIDATES):
+        self.timer = timer or StageTimer()
+        self.smoother = smoother or MatchSmoother()
+        self.dynamic_recognizer = dynamic_recognizer
+        self.rank = rank
+        self.candidates = []
+
+    def recognize(self, left_hand_keypoints, right_hand_keypoints, pose_keypoints):
+        """Return (gesture_match, dynamic_match) for one frame of (21, 3) hands and a (33, 3) pose."""
+        return self.recognize_landmarks(np.stack((left_hand_keypoints, right_hand_keypoints)), pose_keypoints)
+
+    def recognize_landmarks(self, hands, pose):
+        """recognize() for (2, 21, 3) hands, left first, such as a LandmarkBuffer's."""
+        with self.timer.measure("features"):
+            features = extract_features(hands, pose)
+
+        with self.timer.measure("match"):
+            if self.rank:
+                gesture_match, self.candidates = match_and_rank_features(features, self.smoother, self.rank)
+            else:
+                gesture_match = match_features(features, self.smoother)
+
+        dynamic_match = None
+        if self.dynamic_recognizer is not None:
+            with self.timer.measure("dynamic"):
+                dynamic_match = self.dynamic_recognizer.update(features)
+
+        return gesture_match, dynamic_match
+
+class GestureRecognizer(KeypointRecognizer):
+    """Runs landmark detection, then feature extraction and gesture matching, on a single frame.
+
+    If a LandmarkRecorder is given, every frame's keypoints are also written to its log.
+    """
+
+    def __init__(self, timer, pose_interval=1, pose_motion_threshold=None, smoother=None, dynamic_recognizer=None,
+                 recorder=None, hand_roi=False):
+        super().__init__(timer, smoother, dynamic_recognizer)
+        self.detector = LandmarkDetector(timer, pose_interval, pose_motion_threshold, hand_roi)
+        self.recorder = recorder
+        self.landmarks = LandmarkBuffer()
+
+    def process(self, captured_at, frame):
+        import cv2  # Like MediaPipe, only needed for live frames, not for replaying landmark logs
+
+        with self.timer.measure("convert"):
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        results_pose, results_hands = self.detector.process(frame_rgb)
+        landmarks = self.landmarks
+        with self.timer.measure("landmarks"):
+            landmarks.fill(results_pose, results_hands)
+        if self.recorder is not None:
+            self.recorder.write(captured_at, landmarks.left_hand, landmarks.right_hand, landmarks.pose)
+
+        gesture_match, dynamic_match = self.recognize_landmarks(landmarks.hands, landmarks.pose)
+        return FrameResult(captured_at, frame_rgb, results_pose, results_hands, gesture_match, dynamic_match,
+                           self.candidates)
+
+    def close(self):
+        self.detector.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+class CaptureThread(threading.Thread):
+    """Reads frames from the camera as fast as it delivers them, keeping only the newest.
+
+    For video files, pass frame_interval to replay at the file's frame rate and
+    stop_on_end to finish once the file runs out.
+
+    With an AdaptiveScheduler, every camera frame is grabbed but only decoded when the
+    scheduler wants one and inference has taken the previous one; the rest are skipped.
+    """
+
+    def __init__(self, cap, frames, timer, frame_interval=None, stop_on_end=False, scheduler=None):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.frames = frames
+        self.timer = timer
+        self.frame_interval = frame_interval
+        self.stop_on_end = stop_on_end
+        self.scheduler = scheduler
+        self._stop_event = threading.Event()
+
+    def _read(self, last_sent_at):
+        if self.scheduler is None:
+            return self.cap.read()
+
+        if not self.cap.grab():
+            return False, None
+        due = time.perf_counter() - last_sent_at >= self.scheduler.frame_interval
+        if not due or len(self.frames):
+            self.timer.count("skipped")
+            return True, None
+        return self.cap.retrieve()
+
+    def run(self):
+        import cv2
+
+        next_frame_at = time.perf_counter()
+        last_sent_at = 0
+        while not self._stop_event.is_set():
+            with self.timer.measure("capture"):
+                ret, frame = self._read(last_sent_at)
+            if not ret:
+                if self.stop_on_end:
+                    break
+                time.sleep(0.01)
+                continue
+            if frame is None:
+                continue
+
+            self.timer.count("captured")
+            frame = cv2.flip(frame, 1)
+            if self.scheduler is not None and self.scheduler.scale != 1.0:
+                with self.timer.measure("resize"):
+                    frame = cv2.resize(frame, None, fx=self.scheduler.scale, fy=self.scheduler.scale,
+                                       interpolation=cv2.INTER_AREA)
+            last_sent_at = time.perf_counter()
+            if self.frames.put((last_sent_at, frame)):
+                self.timer.count("dropped")
+
+            if self.frame_interval:
+                next_frame_at += self.frame_interval
+                self._stop_event.wait(max(0, next_frame_at - time.perf_counter()))
+
+    def stop(self):
+        self._stop_event.set()
+
+class InferenceWorker(threading.Thread):
+    """Turns captured frames into FrameResults on its own thread, reporting back to the scheduler if given."""
+
+    def __init__(self, recognizer, frames, results, scheduler=None):
+        super().__init__(daemon=True)
+        self.recognizer = recognizer
+        self.frames = frames
+        self.results = results
+        self.scheduler = scheduler
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_error = None
+        while not self._stop_event.is_set():
+            item = self.frames.get(timeout=0.1)
+            if item is None:
+                continue
+            try:
+                result = self.recognizer.process(*item)
+            except Exception as error:
+                # Keep going with the next frame; a failure that repeats every frame is only printed once
+                self.recognizer.timer.count("errors")
+                if repr(error) != last_error:
+                    last_error = repr(error)
+                    print(f"[inference] frame failed: {error!r}")
+                    traceback.print_exc()
+                continue
+            last_error = None
+            latency = time.perf_counter() - result.captured_at
+            self.recognizer.timer.record("latency", latency)
+            self.recognizer.timer.count("processed")
+            if self.scheduler is not None:
+                self.scheduler.update(bool(result.results_hands.multi_hand_landmarks), latency)
+            if self.results.put(result):
+                self.recognizer.timer.count("results_dropped")
+
+    def stop(self):
+        self._stop_event.set()
+        self.frames.close()
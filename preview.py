@@ -0,0 +1,74 @@
+import time
+import cv2
+from PIL import Image, ImageTk
+
+PREVIEW_FPS = 15  # Display rate of the video preview, independent of the inference rate
+PREVIEW_WIDTH = 480  # Frames are shrunk to this width before anything is drawn on them
+
+class PreviewRenderer:
+    """Draws inference results into a Tk label at a capped rate and size.
+
+    Frames are downsampled before the landmarks and text are drawn, and always to the same
+    display size, so one PhotoImage is reused with paste() instead of allocating a new one
+    per frame. Frames the scheduler shrinks while idle are scaled back up to that size, so
+    the preview does not jump; only a larger frame replaces the PhotoImage. Nothing is
+    drawn while the label is not visible.
+    """
+
+    def __init__(self, label, timer, fps=PREVIEW_FPS, max_width=PREVIEW_WIDTH):
+        import mediapipe as mp  # Imported lazily, like in LandmarkDetector
+
+        self.mp_drawing = mp.solutions.drawing_utils
+        self.mp_pose = mp.solutions.pose
+        self.mp_hands = mp.solutions.hands
+        self.label = label
+        self.timer = timer
+        self.frame_interval = 1 / fps if fps else 0
+        self.max_width = max_width
+        self.size = None
+        self.photo = None
+        self.last_render = 0.0
+
+    def due(self):
+        if time.perf_counter() - self.last_render < self.frame_interval:
+            return False
+        return bool(self.label.winfo_viewable())  # Minimized or withdrawn windows are not drawn
+
+    def _display_size(self, frame):
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            return self.max_width, round(height * self.max_width / width)
+        return width, height
+
+    def render(self, result, caption, overlay=None):
+        self.last_render = time.perf_counter()
+
+        with self.timer.measure("draw"):
+            frame = result.frame_rgb
+            size = self._display_size(frame)
+            if self.size is None or size[0] > self.size[0]:
+                self.size = size
+                self.photo = None
+            if (frame.shape[1], frame.shape[0]) != self.size:
+                frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+
+            # Landmarks are normalized, so they are drawn on the small frame directly
+            if result.results_pose.pose_landmarks:
+                self.mp_drawing.draw_landmarks(frame, result.results_pose.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
+
+            if result.results_hands.multi_hand_landmarks:
+                for hand_landmarks in result.results_hands.multi_hand_landmarks:
+                    self.mp_drawing.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+
+            cv2.putText(frame, caption, (20, 20), cv2.FONT_HERSHEY_SIMPLEX, .5, (255, 255, 255), 1)
+            if overlay:
+                cv2.putText(frame, overlay, (20, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, .4, (255, 255, 0), 1)
+
+        with self.timer.measure("display"):
+            image = Image.fromarray(frame)
+            if self.photo is None:
+                self.photo = ImageTk.PhotoImage(image=image)
+                self.label.configure(image=self.photo)
+            else:
+                self.photo.paste(image)
+        self.timer.count("rendered")
@@ -0,0 +1,145 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from feature_extraction import FEATURE_SLICES, POSE_LANDMARKS, HAND_LANDMARKS, process_keypoints_batch
+from gesture_store import GESTURE_STORE, LEGACY_JSON, open_store
+from landmark_log import LOG_EXTENSION, load_log_landmarks
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+LANDMARK_EXTENSIONS = {".npz", LOG_EXTENSION}
+
+def find_recordings(input_dir):
+    """Yield (gesture name, path) for every recording under input_dir.
+
+    Recordings in a subdirectory belong to the gesture named after that directory;
+    recordings at the top level are named after the file itself.
+    """
+    for dirpath, _, filenames in sorted(os.walk(input_dir)):
+        for filename in sorted(filenames):
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() not in VIDEO_EXTENSIONS | LANDMARK_EXTENSIONS:
+                continue
+            relative_dir = os.path.relpath(dirpath, input_dir)
+            gesture_name = stem if relative_dir == "." else relative_dir.split(os.sep)[0]
+            yield gesture_name, os.path.join(dirpath, filename)
+
+def load_landmarks(path):
+    """Load (left_hand, right_hand, pose) arrays from a saved .npz landmark dump or landmark log."""
+    if os.path.splitext(path)[1].lower() == LOG_EXTENSION:
+        return load_log_landmarks(path)
+    with np.load(path) as data:
+        return data["left_hand"], data["right_hand"], data["pose"]
+
+def extract_video_landmarks(path, stride=1, flip=True):
+    """Run MediaPipe over a video file, returning (left_hand, right_hand, pose) arrays."""
+    import cv2
+    from landmarks import LandmarkBuffer
+    from pipeline import LandmarkDetector
+
+    left_hands, right_hands, poses = [], [], []
+    cap = cv2.VideoCapture(path)
+    detector = LandmarkDetector()
+    landmarks = LandmarkBuffer()
+    frame_index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_index += 1
+            if (frame_index - 1) % stride:
+                continue
+
+            if flip:
+                frame = cv2.flip(frame, 1)  # Match the mirrored live camera feed
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            landmarks.fill(*detector.process(frame_rgb))
+            left_hands.append(landmarks.left_hand.copy())
+            right_hands.append(landmarks.right_hand.copy())
+            poses.append(landmarks.pose.copy())
+    finally:
+        detector.close()
+        cap.release()
+
+    return (
+        np.array(left_hands, dtype=np.float64).reshape(-1, HAND_LANDMARKS, 3),
+        np.array(right_hands, dtype=np.float64).reshape(-1, HAND_LANDMARKS, 3),
+        np.array(poses, dtype=np.float64).reshape(-1, POSE_LANDMARKS, 3),
+    )
+
+def featurize_recording(path, features=tuple(FEATURE_SLICES), stride=1, flip=True, keep_empty=False):
+    """Turn one recording into a float32 (samples, FEATURE_SIZE) array, NaN for features not kept."""
+    if os.path.splitext(path)[1].lower() in LANDMARK_EXTENSIONS:
+        left_hands, right_hands, poses = (array[::stride] for array in load_landmarks(path))
+    else:
+        left_hands, right_hands, poses = extract_video_landmarks(path, stride, flip)
+
+    samples = process_keypoints_batch(left_hands, right_hands, poses).astype(np.float32)
+
+    if not keep_empty:
+        # Frames where MediaPipe saw neither hand carry no gesture information
+        has_hand = np.any(left_hands != 0, axis=(1, 2)) | np.any(right_hands != 0, axis=(1, 2))
+        samples = samples[has_hand]
+
+    for feature, columns in FEATURE_SLICES.items():
+        if feature not in features:
+            samples[:, columns] = np.nan
+
+    return samples
+
+def refeaturize(input_dir, store_path=GESTURE_STORE, features=tuple(FEATURE_SLICES), stride=1, flip=True,
+                keep_empty=False, workers=None):
+    """Re-extract every recording under input_dir across a process pool and write the gestures to the store.
+
+    Gestures none of whose recordings yield a sample are reported and left as they are in the store.
+    """
+    recordings = list(find_recordings(input_dir))
+    gesture_samples = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (gesture_name, path, executor.submit(featurize_recording, path, features, stride, flip, keep_empty))
+            for gesture_name, path in recordings
+        ]
+        for gesture_name, path, future in futures:
+            samples = future.result()
+            print(f"{path}: {len(samples)} samples for '{gesture_name}'")
+            gesture_samples.setdefault(gesture_name, []).append(samples)
+
+    # Only the default store starts out as a copy of the legacy gestures.json
+    store = open_store(store_path, LEGACY_JSON if store_path == GESTURE_STORE else None)
+    for gesture_name, arrays in list(gesture_samples.items()):
+        samples = np.concatenate(arrays)
+        if not len(samples):
+            print(f"Skipped '{gesture_name}': no samples in its recordings, the stored gesture is kept")
+            del gesture_samples[gesture_name]
+            continue
+        store.add_gesture(gesture_name, samples)
+    return gesture_samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rebuild gesture data from recorded videos, landmark logs (.lmk) or .npz landmark dumps "
+                    "(arrays 'left_hand' (N, 21, 3), 'right_hand' (N, 21, 3) and 'pose' (N, 33, 3)). "
+                    "Recordings in <input_dir>/<gesture name>/ replace that gesture in the store."
+    )
+    parser.add_argument("input_dir")
+    parser.add_argument("--store", default=GESTURE_STORE, help="Gesture store to write to")
+    parser.add_argument("--features", default=",".join(FEATURE_SLICES),
+                        help="Comma-separated features to keep (default: all)")
+    parser.add_argument("--stride", type=int, default=1, help="Only use every Nth frame")
+    parser.add_argument("--no-flip", action="store_true", help="Do not mirror video frames like the live camera")
+    parser.add_argument("--keep-empty", action="store_true", help="Keep frames where no hand was detected")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    features = tuple(feature.strip() for feature in args.features.split(",") if feature.strip())
+    unknown = set(features) - set(FEATURE_SLICES)
+    if unknown:
+        parser.error(f"Unknown features: {', '.join(sorted(unknown))}")
+
+    gesture_samples = refeaturize(args.input_dir, args.store, features, args.stride, not args.no_flip,
+                                  args.keep_empty, args.workers)
+    print(f"Wrote {len(gesture_samples)} gestures to {args.store}")
@@ -0,0 +1,169 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from metrics import MetricsServer, write_metrics
+from pipeline import AdaptiveScheduler, CaptureThread, FrameQueue, GestureRecognizer, StageTimer
+from static_detection import MATCHER_BACKEND, MATCHER_BACKENDS, MatchSmoother, refresh_gesture_index, set_matcher_backend
+
+REPORT_INTERVAL = 5  # Seconds between per-stream FPS reports
+POSE_REFRESH_INTERVAL = 5
+POSE_MOTION_THRESHOLD = 0.05
+
+# Headless serving mode: one process handles several cameras or video files. Every stream
+# keeps its own capture thread, MediaPipe models (their tracking state is per stream) and
+# match smoother, while the gesture matcher tables in static_detection are loaded once and
+# shared read-only. Inference for all streams runs on one worker pool.
+
+def parse_source(source):
+    """Camera indices are given as integers, anything else is a video file path."""
+    return int(source) if source.isdigit() else source
+
+class StreamSession:
+    def __init__(self, name, source, pose_interval=POSE_REFRESH_INTERVAL, pose_motion_threshold=POSE_MOTION_THRESHOLD,
+                 hand_roi=False):
+        self.name = name
+        self.source = source
+        self.timer = StageTimer()
+        self.frames = FrameQueue(maxsize=1)
+        self.cap = cv2.VideoCapture(source)
+        self.recognizer = GestureRecognizer(self.timer, pose_interval, pose_motion_threshold, MatchSmoother(),
+                                            hand_roi=hand_roi)
+
+        is_file = isinstance(source, str)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if is_file else 0
+        # Cameras slow down while nobody is in front of them; files are always processed in full
+        self.scheduler = None if is_file else AdaptiveScheduler()
+        self.capture_thread = CaptureThread(
+            self.cap, self.frames, self.timer,
+            frame_interval=1 / fps if fps > 0 else None,
+            stop_on_end=is_file,
+            scheduler=self.scheduler,
+        )
+
+        self.busy = False
+        self.processed = 0
+        self.last_match = "No Match"
+        self._reported_processed = 0
+        self._reported_at = time.perf_counter()
+
+    @property
+    def finished(self):
+        return not self.capture_thread.is_alive() and not self.busy and not len(self.frames)
+
+    def process(self, item):
+        result = self.recognizer.process(*item)
+        latency = time.perf_counter() - result.captured_at
+        self.timer.record("latency", latency)
+        if self.scheduler is not None:
+            self.scheduler.update(bool(result.results_hands.multi_hand_landmarks), latency)
+        self.timer.count("processed")
+        self.processed += 1
+        if result.gesture_match != self.last_match:
+            self.last_match = result.gesture_match
+            if result.gesture_match != "No Match":
+                print(f"[{self.name}] {result.gesture_match}")
+        return result
+
+    def report(self):
+        now = time.perf_counter()
+        fps = (self.processed - self._reported_processed) / (now - self._reported_at)
+        self._reported_processed = self.processed
+        self._reported_at = now
+        return f"[{self.name}] {fps:.1f} fps | {self.timer.report()}"
+
+    def close(self):
+        self.capture_thread.stop()
+        self.capture_thread.join()
+        self.recognizer.close()
+        self.cap.release()
+
+class StreamServer:
+    """Schedules the newest frame of every idle stream onto a shared worker pool."""
+
+    def __init__(self, sources, workers=None, report_interval=REPORT_INTERVAL, metrics_port=None, metrics_file=None,
+                 hand_roi=False):
+        self.sessions = [
+            StreamSession(f"stream{i}", parse_source(source), hand_roi=hand_roi) for i, source in enumerate(sources)
+        ]
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(len(self.sessions), os.cpu_count() or 1))
+        self.report_interval = report_interval
+        self.timers = {session.name: session.timer for session in self.sessions}
+        self.metrics_file = metrics_file
+        self.metrics_server = MetricsServer(self.timers, metrics_port) if metrics_port is not None else None
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+
+    def _finish(self, session, future):
+        if future.exception() is not None:
+            print(f"[{session.name}] inference failed: {future.exception()!r}")
+        session.busy = False
+        self._wakeup.set()
+
+    def run(self):
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+        for session in self.sessions:
+            session.capture_thread.start()
+
+        last_report = time.perf_counter()
+        try:
+            while not self._stop_event.is_set() and not all(session.finished for session in self.sessions):
+                submitted = False
+                for session in self.sessions:
+                    if session.busy:
+                        continue
+                    item = session.frames.get(timeout=0)
+                    if item is None:
+                        continue
+                    # One frame in flight per stream keeps each stream's MediaPipe tracking in order
+                    session.busy = True
+                    future = self.executor.submit(session.process, item)
+                    future.add_done_callback(lambda future, session=session: self._finish(session, future))
+                    submitted = True
+
+                if not submitted:
+                    self._wakeup.wait(0.005)
+                    self._wakeup.clear()
+
+                if time.perf_counter() - last_report >= self.report_interval:
+                    for session in self.sessions:
+                        print(session.report())
+                    if self.metrics_file:
+                        write_metrics(self.metrics_file, self.timers)
+                    if refresh_gesture_index():
+                        print("Reloaded gestures from the store")
+                    last_report = time.perf_counter()
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def close(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.executor.shutdown()
+        for session in self.sessions:
+            session.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recognize gestures from several cameras or video files without a UI.")
+    parser.add_argument("sources", nargs="+", help="Camera indices (e.g. 0 1) and/or video file paths")
+    parser.add_argument("--workers", type=int, default=None, help="Inference threads shared by all streams")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL, help="Seconds between FPS reports")
+    parser.add_argument("--metrics-port", type=int, help="Serve /metrics and /metrics.json on this local port")
+    parser.add_argument("--metrics-file", help="Rewrite this JSON file with every stream's metrics at each report")
+    parser.add_argument("--hand-roi", action="store_true", help="Detect hands on crops around the wrists")
+    parser.add_argument("--matcher", choices=MATCHER_BACKENDS, default=MATCHER_BACKEND, help="Static gesture matcher")
+    args = parser.parse_args()
+    set_matcher_backend(args.matcher)
+
+    server = StreamServer(args.sources, args.workers, args.report_interval, args.metrics_port, args.metrics_file,
+                          args.hand_roi)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
@@ -1,19 +1,23 @@
-import queue
+import asyncio
 import re
 import sys
+import threading
 import time
-from google.cloud import speech
-import pyaudio
 import os
+from collections import deque
+from contextlib import aclosing
 
 transcribed_text = ''
 # Set the path to your Google Cloud service account key
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "Dual-Modal-Translator\dual-modal-translator-cb789111ae3d.json"
 
 # Audio recording parameters
-STREAMING_LIMIT = 1800000  
+STREAMING_LIMIT = 1800000
 SAMPLE_RATE = 16000
 CHUNK_SIZE = int(SAMPLE_RATE / 10)  # 100ms
+SAMPLE_WIDTH = 2  # Bytes per LINEAR16 sample
+BRIDGING_WINDOW_MS = 10000  # Audio kept to resend after the last final result when a stream restarts
+MAX_PENDING_CHUNKS = 50  # Chunks (5 s) allowed to queue up before the oldest are dropped
 
 RED = "\033[0;31m"
 GREEN = "\033[0;32m"
@@ -23,121 +27,302 @@ YELLOW = "\033[0;33m"
 def get_current_time() -> int:
     return int(round(time.time() * 1000))
 
-class ResumableMicrophoneStream:
-    def __init__(self, rate: int, chunk_size: int) -> None:
-        self._rate = rate
-        self.chunk_size = chunk_size
-        self._num_channels = 1
-        self._buff = queue.Queue()
-        self.closed = True
-        self.start_time = get_current_time()
-        self.restart_counter = 0
-        self.audio_input = []
-        self.last_audio_input = []
-        self.result_end_time = 0
-        self.is_final_end_time = 0
-        self.final_request_end_time = 0
-        self.bridging_offset = 0
-        self.last_transcript_was_final = False
-        self.new_stream = True
+class AudioRingBuffer:
+    """Fixed-size byte ring holding the most recent audio, addressed by absolute byte offset."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self.end = 0  # Total bytes ever written
+
+    @property
+    def start(self) -> int:
+        """Oldest absolute offset still held."""
+        return max(0, self.end - self.capacity)
+
+    def write(self, data: object) -> None:
+        data = memoryview(data).cast("B")
+        if len(data) > self.capacity:
+            self.end += len(data) - self.capacity
+            data = data[len(data) - self.capacity:]
+
+        position = self.end % self.capacity
+        first = min(len(data), self.capacity - position)
+        self._view[position:position + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self.end += len(data)
+
+    def read(self, start: int, end: int) -> list:
+        """Return memoryviews over the held bytes in [start, end); valid until the ring wraps past them."""
+        start = max(start, self.start)
+        end = min(end, self.end)
+        if start >= end:
+            return []
+
+        position = start % self.capacity
+        length = end - start
+        if position + length <= self.capacity:
+            return [self._view[position:position + length]]
+        return [self._view[position:], self._view[:length - (self.capacity - position)]]
+
+class AudioStream:
+    """Bounded hand-off from the audio callback thread to the asyncio recognizer.
+
+    Chunks are passed along as memoryviews of the buffers the callback received, and also
+    written once into a ring buffer sized to the bridging window, so audio after the last
+    final result can be resent when the recognizer stream restarts. If the recognizer falls
+    behind, the oldest pending chunks are dropped instead of letting memory grow.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, rate: int = SAMPLE_RATE,
+                 max_pending: int = MAX_PENDING_CHUNKS, bridging_window_ms: int = BRIDGING_WINDOW_MS) -> None:
+        self._loop = loop
+        self.bytes_per_ms = rate * SAMPLE_WIDTH // 1000
+        self.bridging_window = bridging_window_ms * self.bytes_per_ms
+        self.ring = AudioRingBuffer(self.bridging_window + max_pending * CHUNK_SIZE * SAMPLE_WIDTH)
+        self._pending = deque()
+        self._max_pending = max_pending
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, data: object) -> None:
+        """Hand over a chunk (or None to close) from any thread."""
+        self._loop.call_soon_threadsafe(self._enqueue, data)
+
+    def close(self) -> None:
+        self.push(None)
+
+    def _enqueue(self, data: object) -> None:
+        if data is None:
+            self.closed = True
+        else:
+            start = self.ring.end
+            self.ring.write(data)
+            if len(self._pending) == self._max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((start, memoryview(data)))
+        self._ready.set()
+
+    @property
+    def finished(self) -> bool:
+        return self.closed and not self._pending
+
+    def pending_start(self) -> int:
+        """Absolute offset of the oldest chunk not yet handed to the recognizer."""
+        return self._pending[0][0] if self._pending else self.ring.end
+
+    async def next_chunk(self) -> object:
+        """Wait for the next (offset, chunk) pair, or None once the stream is closed and drained."""
+        while not self._pending:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pending.popleft()
+
+class MicrophoneInput:
+    """Feeds PyAudio callback chunks into an AudioStream."""
+
+    def __init__(self, audio: AudioStream, rate: int = SAMPLE_RATE, chunk_size: int = CHUNK_SIZE) -> None:
+        import pyaudio
+
+        self.audio = audio
+        self._continue = pyaudio.paContinue
         self._audio_interface = pyaudio.PyAudio()
         self._audio_stream = self._audio_interface.open(
             format=pyaudio.paInt16,
-            channels=self._num_channels,
-            rate=self._rate,
+            channels=1,
+            rate=rate,
             input=True,
-            frames_per_buffer=self.chunk_size,
+            frames_per_buffer=chunk_size,
             stream_callback=self._fill_buffer,
         )
 
-    def __enter__(self) -> object:
-        self.closed = False
-        return self
+    def _fill_buffer(self, in_data: object, *args: object, **kwargs: object) -> object:
+        self.audio.push(in_data)
+        return None, self._continue
 
-    def __exit__(self, type: object, value: object, traceback: object) -> object:
+    def close(self) -> None:
         self._audio_stream.stop_stream()
         self._audio_stream.close()
-        self.closed = True
-        self._buff.put(None)
         self._audio_interface.terminate()
+        self.audio.close()
 
-    def _fill_buffer(self, in_data: object, *args: object, **kwargs: object) -> object:
-        self._buff.put(in_data)
-        return None, pyaudio.paContinue
-
-    def generator(self) -> object:
-        while not self.closed:
-            data = []
-
-            if self.new_stream and self.last_audio_input:
-                chunk_time = STREAMING_LIMIT / len(self.last_audio_input)
+class GoogleSpeechBackend:
+    """Streams audio to Google Cloud Speech-to-Text."""
 
-                if chunk_time != 0:
-                    if self.bridging_offset < 0:
-                        self.bridging_offset = 0
+    def __init__(self, language_code: str = "fil-PH", sample_rate: int = SAMPLE_RATE) -> None:
+        from google.cloud import speech
 
-                    if self.bridging_offset > self.final_request_end_time:
-                        self.bridging_offset = self.final_request_end_time
-
-                    chunks_from_ms = round(
-                        (self.final_request_end_time - self.bridging_offset)
-                        / chunk_time
-                    )
-
-                    self.bridging_offset = round(
-                        (len(self.last_audio_input) - chunks_from_ms) * chunk_time
-                    )
-
-                    for i in range(chunks_from_ms, len(self.last_audio_input)):
-                        data.append(self.last_audio_input[i])
-
-                self.new_stream = False
-
-            chunk = self._buff.get()
-            self.audio_input.append(chunk)
-
-            if chunk is None:
+        self._speech = speech
+        self.client = speech.SpeechAsyncClient()
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=language_code,
+            max_alternatives=1,
+        )
+        self.streaming_config = speech.StreamingRecognitionConfig(config=config, interim_results=True)
+
+    async def stream(self, audio_chunks: object) -> object:
+        """Yield (transcript, is_final, result_end_ms) for an async iterator of audio chunks."""
+        speech = self._speech
+
+        async def requests():
+            yield speech.StreamingRecognizeRequest(streaming_config=self.streaming_config)
+            async for chunk in audio_chunks:
+                yield speech.StreamingRecognizeRequest(audio_content=bytes(chunk))  # The protobuf needs bytes
+
+        responses = await self.client.streaming_recognize(requests=requests())
+        async for response in responses:
+            if not response.results:
+                continue
+
+            result = response.results[0]
+            if not result.alternatives:
+                continue
+
+            yield result.alternatives[0].transcript, result.is_final, result.result_end_time.total_seconds() * 1000
+
+class StubRecognizerBackend:
+    """Offline stand-in for Google Speech: emits one scripted final transcript every few chunks.
+
+    With chunks_per_stream, each stream ends after that many chunks, like Google's streaming
+    limit, so restarts can be exercised.
+    """
+
+    def __init__(self, transcripts: list, chunks_per_transcript: int = 10, rate: int = SAMPLE_RATE,
+                 chunks_per_stream: int = None) -> None:
+        self.transcripts = list(transcripts)
+        self.chunks_per_transcript = chunks_per_transcript
+        self.chunks_per_stream = chunks_per_stream
+        self.bytes_per_ms = rate * SAMPLE_WIDTH // 1000
+        self.received_bytes = 0
+
+    async def stream(self, audio_chunks: object) -> object:
+        chunks = 0
+        stream_bytes = 0
+        async for chunk in audio_chunks:
+            chunks += 1
+            stream_bytes += len(chunk)
+            self.received_bytes += len(chunk)
+            if chunks % self.chunks_per_transcript == 0 and self.transcripts:
+                yield self.transcripts.pop(0), True, stream_bytes / self.bytes_per_ms
+            if chunks == self.chunks_per_stream:
                 return
-            data.append(chunk)
 
-            while True:
-                try:
-                    chunk = self._buff.get(block=False)
-                    if chunk is None:
-                        return
-                    data.append(chunk)
-                    self.audio_input.append(chunk)
+class SpeechSession:
+    """Runs recognizer streams back to back over one AudioStream, bridging audio across restarts."""
 
-                except queue.Empty:
-                    break
-
-            yield b"".join(data)
-
-def listen_print_loop(responses, stream, callback=None):
-    transcription = ""
-    for response in responses:
-        if not response.results:
-            continue
-
-        result = response.results[0]
-
-        if not result.alternatives:
-            continue
-
-        transcript = result.alternatives[0].transcript
-        transcription += transcript + "\n"
-
-        if callback:
-            callback(transcript)  # Send real-time updates via the callback
-
-        if result.is_final:
-            sys.stdout.write("\033[K")
-            sys.stdout.write(transcript + "\n")
-            if re.search(r"\b(exit|quit)\b", transcript, re.I):
-                sys.stdout.write("Exiting...\n")
-                stream.closed = True
-                break
-    return transcription
+    def __init__(self, backend: object, audio: AudioStream, callback: object = None, result_callback: object = None) -> None:
+        self.backend = backend
+        self.audio = audio
+        self.callback = callback
+        self.result_callback = result_callback  # Called with (transcript, is_final)
+        self.restart_counter = 0
+        self.stream_start = 0
+        self.final_offset = 0  # Absolute offset of the end of the last final result
+
+    async def _requests(self) -> object:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAMING_LIMIT / 1000
+
+        # Resend what the previous stream heard after its last final result
+        bridge_from = max(self.final_offset, self.audio.ring.end - self.audio.bridging_window)
+        bridge_to = self.audio.pending_start()
+        self.stream_start = max(min(bridge_from, bridge_to), self.audio.ring.start)
+        for view in self.audio.ring.read(self.stream_start, bridge_to):
+            yield view
+
+        while loop.time() < deadline:
+            item = await self.audio.next_chunk()
+            if item is None:
+                return
+            yield item[1]
+
+    async def run(self) -> str:
+        transcription = ""
+        self.final_offset = self.audio.pending_start()  # Nothing to bridge into the first stream
+        while not self.audio.finished:
+            async with aclosing(self.backend.stream(self._requests())) as responses:
+                async for transcript, is_final, result_end_ms in responses:
+                    if self.callback:
+                        self.callback(transcript)  # Send real-time updates via the callback
+                    if self.result_callback:
+                        self.result_callback(transcript, is_final)
+
+                    if not is_final:
+                        continue
+
+                    transcription += transcript + "\n"
+                    self.final_offset = self.stream_start + int(result_end_ms * self.audio.bytes_per_ms)
+                    sys.stdout.write("\033[K")
+                    sys.stdout.write(transcript + "\n")
+                    if re.search(r"\b(exit|quit)\b", transcript, re.I):
+                        sys.stdout.write("Exiting...\n")
+                        self.audio.close()
+                        return transcription
+            self.restart_counter += 1
+        return transcription
+
+async def recognize_speech(callback=None, backend=None, audio=None) -> str:
+    """Stream audio to the recognizer until 'exit'/'quit' is heard or the audio stream is closed.
+
+    Without an audio stream, the microphone is opened; without a backend, Google Speech is used.
+    """
+    backend = backend or GoogleSpeechBackend()
+    microphone = None
+    if audio is None:
+        audio = AudioStream(asyncio.get_running_loop())
+        microphone = MicrophoneInput(audio)
+
+    try:
+        return await SpeechSession(backend, audio, callback).run()
+    finally:
+        if microphone:
+            microphone.close()
+
+class SpeechRecognitionThread(threading.Thread):
+    """Runs speech recognition on its own event loop so it never blocks the caller's thread.
+
+    Every (transcript, is_final) result is put on the given queue.Queue; errors are reported
+    on it as a final "[speech error] ..." transcript. stop() may be called from any thread.
+    """
+
+    def __init__(self, results: object, backend_factory: object = GoogleSpeechBackend) -> None:
+        super().__init__(daemon=True)
+        self.results = results
+        self.backend_factory = backend_factory
+        self._audio = None
+        self._stop_requested = threading.Event()
+
+    def run(self) -> None:
+        try:
+            asyncio.run(self._recognize())
+        except Exception as error:
+            self.results.put((f"[speech error] {error}", True))
+
+    async def _recognize(self) -> None:
+        backend = self.backend_factory()
+        self._audio = AudioStream(asyncio.get_running_loop())
+        if self._stop_requested.is_set():
+            self._audio.close()
+        microphone = MicrophoneInput(self._audio)
+        try:
+            await SpeechSession(backend, self._audio, result_callback=lambda *result: self.results.put(result)).run()
+        finally:
+            microphone.close()
+
+    def stop(self) -> None:
+        self._stop_requested.set()
+        if self._audio is not None:
+            try:
+                self._audio.close()
+            except RuntimeError:
+                pass  # The event loop has already finished
 
 
 def reset_transcription():
@@ -146,43 +331,16 @@ def reset_transcription():
     transcription_output = ""  # Clear the global transcription output
 
 
-def start_speech_recognition(callback=None) -> str:
+def start_speech_recognition(callback=None, backend=None) -> str:
     """Start speech recognition and return the transcribed text."""
     global transcription_output  # Ensure we're modifying the global variable
     transcription_output = ""  # Reset transcription output at the start
 
-    client = speech.SpeechClient()
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=SAMPLE_RATE,
-        language_code="fil-PH",
-        max_alternatives=1,
-    )
-
-    streaming_config = speech.StreamingRecognitionConfig(
-        config=config, interim_results=True
-    )
-
-    mic_manager = ResumableMicrophoneStream(SAMPLE_RATE, CHUNK_SIZE)
-    
-    # Reset transcription each time a new stream starts
-    with mic_manager as stream:
-        while not stream.closed:
-            audio_generator = stream.generator()
-
-            requests = (
-                speech.StreamingRecognizeRequest(audio_content=content)
-                for content in audio_generator
-            )
-
-            responses = client.streaming_recognize(streaming_config, requests)
-
-            # Capture transcription output and invoke callback
-            transcription_output = listen_print_loop(responses, stream, callback)
+    transcription_output = asyncio.run(recognize_speech(callback, backend))
 
     return transcription_output
 
 
 # If you want to run this as a standalone script:
 if __name__ == "__main__":
-    print(start_speech_recognition())
\ No newline at end of file
+    print(start_speech_recognition())
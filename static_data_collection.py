@@ -1,40 +1,42 @@
-import cv2
-import mediapipe as mp
-import json
-import os
-from feature_extraction import process_keypoints
+from feature_extraction import FEATURE_SLICES, extract_features
+from gesture_store import DYNAMIC, GESTURE_STORE, STATIC, open_store
 
 def delete_gesture():
-    if not os.path.exists("gestures.json"):
-        print("No gesture data found.")
-        return
-    
-    with open("gestures.json", "r") as f:
-        gestures_data = json.load(f)
+    store = open_store()
     
-    if not gestures_data:
+    if not len(store):
         print("No gestures to delete.")
         return
     
     print("Existing gestures:")
-    for gesture in gestures_data.keys():
+    for gesture in store:
         print(f"- {gesture}")
     
     gesture_name = input("Enter the name of the gesture to delete: ").strip()
     
-    if gesture_name in gestures_data:
-        del gestures_data[gesture_name]
-        with open("gestures.json", "w") as f:
-            json.dump(gestures_data, f, indent=4)
+    if gesture_name in store:
+        store.remove_gesture(gesture_name)
         print(f"Gesture '{gesture_name}' deleted successfully.")
     else:
         print("Gesture not found.")
 
-def collect_gesture_data():
+def collect_gesture_data(dynamic=False):
+    """Collect a static gesture one frame per key press, or a dynamic one as recorded takes.
+
+    For dynamic gestures, space starts and stops recording a take of the whole motion.
+    """
+    # Camera and MediaPipe are only loaded here, so deleting a gesture starts instantly
+    import cv2
+    import mediapipe as mp
+    from landmarks import LandmarkBuffer
+    from pipeline import LandmarkDetector
+
     gesture_name = input("Enter gesture name: ")
     samples = []
     sample_count = 0
-    total_samples = 50
+    total_samples = 10 if dynamic else 50
+    take = None  # Frames of the dynamic take being recorded
+    take_lengths = []
 
     collect_flexion = input("Collect flexion features? (y/n): ").strip().lower() == 'y'
     collect_position = input("Collect position features? (y/n): ").strip().lower() == 'y'
@@ -45,10 +47,10 @@ def collect_gesture_data():
     mp_hands = mp.solutions.hands
 
     cap = cv2.VideoCapture(0)
+    detector = LandmarkDetector()
+    landmarks = LandmarkBuffer()
     
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose, \
-         mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5) as hands:
-        
+    try:
         while cap.isOpened() and sample_count < total_samples:
             ret, frame = cap.read()
             if not ret:
@@ -57,12 +59,8 @@ def collect_gesture_data():
             frame = cv2.flip(frame, 1)
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-            results_pose = pose.process(frame_rgb)
-            results_hands = hands.process(frame_rgb)
-
-            left_hand_keypoints = [(0, 0, 0)] * 21
-            right_hand_keypoints = [(0, 0, 0)] * 21
-            pose_keypoints = [(0, 0, 0)] * 33
+            results_pose, results_hands = detector.process(frame_rgb)
+            landmarks.fill(results_pose, results_hands)
 
             if results_pose.pose_landmarks:
                 mp_drawing.draw_landmarks(
@@ -72,10 +70,9 @@ def collect_gesture_data():
                     landmark_drawing_spec=mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=1),
                     connection_drawing_spec=mp_drawing.DrawingSpec(color=(255, 255, 255), thickness=2)
                 )
-                pose_keypoints = [(lm.x, lm.y, lm.z) for lm in results_pose.pose_landmarks.landmark]
 
             if results_hands.multi_hand_landmarks:
-                for hand_landmarks, handedness in zip(results_hands.multi_hand_landmarks, results_hands.multi_handedness):
+                for hand_landmarks in results_hands.multi_hand_landmarks:
                     mp_drawing.draw_landmarks(
                         frame,
                         hand_landmarks,
@@ -83,51 +80,55 @@ def collect_gesture_data():
                         landmark_drawing_spec=mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=1),
                         connection_drawing_spec=mp_drawing.DrawingSpec(color=(255, 255, 255), thickness=2)
                     )
-                    hand_keypoints = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
-                    if handedness.classification[0].label == "Left":
-                        left_hand_keypoints = hand_keypoints
-                    elif handedness.classification[0].label == "Right":
-                        right_hand_keypoints = hand_keypoints
 
-            flexion, position, rotation = process_keypoints(left_hand_keypoints, right_hand_keypoints, pose_keypoints)
+            features = extract_features(landmarks.hands, landmarks.pose)
             selected_features = {}
             if collect_flexion:
-                selected_features["flexion"] = flexion
+                selected_features["flexion"] = features[FEATURE_SLICES["flexion"]]
             if collect_position:
-                selected_features["position"] = position
+                selected_features["position"] = features[FEATURE_SLICES["position"]]
             if collect_rotation:
-                selected_features["rotation"] = rotation
+                selected_features["rotation"] = features[FEATURE_SLICES["rotation"]]
+            if take is not None:
+                take.append(selected_features)
+                cv2.putText(frame, "REC", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             
             cv2.imshow('MediaPipe Pose & Hands', frame)
             key = cv2.waitKey(5) & 0xFF
             
-            if key == 32:
+            if key == 32 and dynamic:
+                if take is None:
+                    take = []
+                elif take:
+                    samples.extend(take)
+                    take_lengths.append(len(take))
+                    take = None
+                    sample_count += 1
+                    print(f"Take {sample_count}/{total_samples} collected ({take_lengths[-1]} frames)")
+            elif key == 32:
                 samples.append(selected_features)
                 sample_count += 1
                 print(f"Sample {sample_count}/{total_samples} collected")
             elif key == 27:
                 break
-
+    finally:
+        detector.close()
         cap.release()
         cv2.destroyAllWindows()
 
-    if os.path.exists("gestures.json"):
-        with open("gestures.json", "r") as f:
-            gestures_data = json.load(f)
+    if dynamic:
+        open_store().add_gesture(gesture_name, samples, DYNAMIC, take_lengths)
     else:
-        gestures_data = {}
-
-    gestures_data[gesture_name] = samples
-
-    with open("gestures.json", "w") as f:
-        json.dump(gestures_data, f, indent=4)
+        open_store().add_gesture(gesture_name, samples, STATIC)
     
-    print(f"Gesture data saved to gestures.json")
+    print(f"Gesture data saved to {GESTURE_STORE}")
 
 if __name__ == "__main__":
-    action = input("Do you want to add a new gesture or delete one? (add/delete): ").strip().lower()
+    action = input("Do you want to add a new gesture, add a moving one, or delete one? (add/dynamic/delete): ").strip().lower()
     if action == "add":
         collect_gesture_data()
+    elif action == "dynamic":
+        collect_gesture_data(dynamic=True)
     elif action == "delete":
         delete_gesture()
     else:
@@ -1,6 +1,10 @@
-import numpy as np
+import hashlib
 import json
-from collections import deque
+import os
+import numpy as np
+from collections import deque, namedtuple
+from feature_extraction import FEATURE_SIZE, FEATURE_SLICES
+from gesture_store import STATIC, open_store
 
 # Threshold values for comparison
 thresholds = {
@@ -9,28 +13,489 @@ thresholds = {
     "Rotation": 15,
 }
 
-# Load recorded gestures
-with open("gestures.json", "r") as f:
-    recorded_gestures = json.load(f)
+# Per-gesture, per-dimension thresholds written by tune_thresholds.py, kept in the gesture store.
+# Gestures without an entry (or re-recorded since tuning) use the global thresholds above.
+TUNED_THRESHOLDS = "thresholds.json"
+
+# Which matcher check_gesture_match uses: "range" (per-gesture min/max boxes) or "knn"
+MATCHER_BACKENDS = ("range", "knn")
+MATCHER_BACKEND = "range"
+
+
+# Compiled range matcher tables, reused across restarts while the store and thresholds are unchanged
+MATCHER_CACHE = "matcher_cache.npz"
+MATCHER_CACHE_VERSION = 3
 
 # Rolling window for smoothing
 window_size = 5
-match_history = deque(maxlen=window_size)
 
-# Precompute feature ranges for each gesture
-gesture_ranges = {}
-for gesture_name, samples in recorded_gestures.items():
-    feature_ranges = {}
+# Candidates returned per frame by rank_features
+RANK_CANDIDATES = 3
 
-    for feature in ["flexion", "position", "rotation"]:
-        if all(feature in sample for sample in samples):
-            values = np.array([sample[feature] for sample in samples])
+# A ranked gesture: distance is in units of the thresholds (0 inside the recorded range, up to
+# 1 at the edge of the range plus threshold), margin how much closer it is than the next one
+Candidate = namedtuple("Candidate", "name distance margin")
+
+def compute_feature_ranges(samples):
+    """Per-feature min/max of one gesture's samples, skipping features missing from any sample."""
+    feature_ranges = {}
+    for feature, columns in FEATURE_SLICES.items():
+        values = np.asarray(samples[:, columns], dtype=np.float64)
+        if not np.isnan(values).any():
             feature_ranges[feature] = {
                 "min": np.min(values, axis=0),
                 "max": np.max(values, axis=0),
             }
+    return feature_ranges
+
+def compute_gesture_ranges(store):
+    """Compute per-feature min/max for each gesture, skipping features missing from any sample."""
+    gesture_ranges = {}
+    for gesture_name, samples in store.items():
+        if len(samples) == 0:
+            continue
+        gesture_ranges[gesture_name] = compute_feature_ranges(samples)
+    return gesture_ranges
+
+def threshold_scale(thresholds):
+    """The threshold of each feature dimension, as a (FEATURE_SIZE,) vector."""
+    scale = np.empty(FEATURE_SIZE)
+    for feature, columns in FEATURE_SLICES.items():
+        scale[columns] = thresholds[feature.capitalize()]
+    return scale
+
+def gesture_scale(thresholds, gesture_name=None):
+    """Per-dimension thresholds of one gesture: its tuned ones if thresholds has any, else the global ones."""
+    tuned = thresholds.get("gestures", {}).get(gesture_name)
+    return np.array(tuned, dtype=np.float64) if tuned is not None else threshold_scale(thresholds)
+
+def load_thresholds(store, path=None):
+    """The global thresholds, plus the tuned ones of every gesture tuned since it was last recorded.
+
+    Tuned thresholds go under a "gestures" key, {name: FEATURE_SIZE thresholds}, so they
+    are part of the matcher cache key like the global ones.
+    """
+    try:
+        with open(path or os.path.join(store.path, TUNED_THRESHOLDS), "r") as f:
+            tuned = json.load(f)["gestures"]
+    except (OSError, ValueError, KeyError):
+        return thresholds
+
+    current = {}
+    for gesture_name, entry in tuned.items():
+        stored = store.header["gestures"].get(gesture_name)
+        if stored is not None and stored["file"] == entry["file"]:
+            current[gesture_name] = entry["thresholds"]
+    return dict(thresholds, gestures=current) if current else thresholds
+
+def rank_candidates(distances, names, max_distance, k=RANK_CANDIDATES):
+    """Turn (N, G) gesture distances into a list of up to k Candidates per frame, closest first.
+
+    Only gestures within max_distance are candidates. A margin is measured to the next
+    closest gesture, or to max_distance if there is none, so it never overstates how
+    clear a match is.
+    """
+    distances = np.where(np.isnan(distances), np.inf, distances)
+    ranked = []
+    for row in distances:
+        order = np.argsort(row, kind="stable")[:k + 1]
+        closest = np.minimum(row[order], max_distance).tolist() + [max_distance]
+        ranked.append([Candidate(names[index], closest[i], closest[i + 1] - closest[i])
+                       for i, index in enumerate(order[:k]) if row[index] <= max_distance])
+    return ranked
+
+def get_gesture_store():
+    """The recorded gestures, memory-mapped; opened (and converted from gestures.json) on first use, not at import."""
+    if "gesture_store" not in globals():
+        globals()["gesture_store"] = open_store()
+    return globals()["gesture_store"]
+
+def __getattr__(name):
+    # gesture_store and gesture_ranges are only opened or computed on first access, so importing never touches disk
+    if name == "gesture_store":
+        return get_gesture_store()
+    if name == "gesture_ranges":
+        globals()["gesture_ranges"] = compute_gesture_ranges(get_gesture_store())
+        return globals()["gesture_ranges"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class GestureIndex:
+    """Gesture ranges compiled into contiguous (G, D) bounds for broadcast matching.
+
+    files optionally records the store file each gesture was computed from, so updated()
+    can tell which gestures changed. key identifies the store state the index reflects.
+    scale holds each gesture's per-dimension thresholds, tuned or global.
+    """
+
+    backend = "range"
+    max_distance = 1.0  # Distances up to 1.0 are within the range plus threshold, i.e. matches
+
+    def __init__(self, gesture_ranges, thresholds, files=None):
+        self.names = list(gesture_ranges.keys())
+        self.files = list(files) if files is not None else [None] * len(self.names)
+        self.thresholds = thresholds
+        self.key = None
+        self.mask = np.zeros((len(self.names), FEATURE_SIZE), dtype=bool)
+        self.lower = np.full((len(self.names), FEATURE_SIZE), -np.inf)
+        self.upper = np.full((len(self.names), FEATURE_SIZE), np.inf)
+        self.scale = np.empty((len(self.names), FEATURE_SIZE))
+
+        for row, (gesture_name, feature_ranges) in enumerate(gesture_ranges.items()):
+            self.mask[row], self.lower[row], self.upper[row], self.scale[row] = self._bounds(feature_ranges, gesture_name)
+
+    def _bounds(self, feature_ranges, gesture_name=None):
+        scale = gesture_scale(self.thresholds, gesture_name)
+        mask = np.zeros(FEATURE_SIZE, dtype=bool)
+        lower = np.full(FEATURE_SIZE, -np.inf)
+        upper = np.full(FEATURE_SIZE, np.inf)
+        for feature, feature_range in feature_ranges.items():
+            columns = FEATURE_SLICES[feature]
+            mask[columns] = True
+            lower[columns] = np.asarray(feature_range["min"]) - scale[columns]
+            upper[columns] = np.asarray(feature_range["max"]) + scale[columns]
+        return mask, lower, upper, scale
+
+    def updated(self, store, thresholds=None):
+        """Return a new index for the store's current static gestures, reusing the rows of unchanged ones.
+
+        Only gestures added or replaced since this index was built are recomputed, each from
+        its own samples; with new thresholds, every gesture is. The index itself is left
+        untouched, so it can keep serving matches.
+        """
+        thresholds = self.thresholds if thresholds is None else thresholds
+        rows = {}
+        if thresholds == self.thresholds:
+            rows = {(name, file): row for row, (name, file) in enumerate(zip(self.names, self.files)) if file}
+        index = GestureIndex({}, thresholds)
+        masks, lowers, uppers, scales = [], [], [], []
+        for gesture_name, entry in store.header["gestures"].items():
+            if entry.get("kind", STATIC) != STATIC or not entry["samples"]:
+                continue
+            row = rows.get((gesture_name, entry["file"]))
+            if row is not None:
+                bounds = self.mask[row], self.lower[row], self.upper[row], self.scale[row]
+            else:
+                bounds = index._bounds(compute_feature_ranges(store.samples(gesture_name)), gesture_name)
+            index.names.append(gesture_name)
+            index.files.append(entry["file"])
+            masks.append(bounds[0])
+            lowers.append(bounds[1])
+            uppers.append(bounds[2])
+            scales.append(bounds[3])
+
+        if index.names:
+            index.mask, index.lower, index.upper = np.array(masks), np.array(lowers), np.array(uppers)
+            index.scale = np.array(scales)
+        return index
+
+    def save(self, path, key):
+        np.savez(path, key=key, names=np.array(self.names, dtype=str), files=np.array(self.files, dtype=str),
+                 mask=self.mask, lower=self.lower, upper=self.upper, scale=self.scale)
+
+    @classmethod
+    def load(cls, path, key, thresholds):
+        """Load tables written by save(); returns None if the file is missing or was saved under another key."""
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) != key:
+                    return None
+                index = cls({}, thresholds)
+                index.names, index.files = data["names"].tolist(), data["files"].tolist()
+                index.mask, index.lower, index.upper, index.scale = data["mask"], data["lower"], data["upper"], data["scale"]
+                index.key = key
+                return index
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def match_all(self, features):
+        """Return a (N, G) boolean matrix of which gestures each of the (N, D) frames falls into.
+
+        Features a gesture was not recorded with have infinite bounds, so they always pass.
+        """
+        features = np.asarray(features, dtype=np.float64)[:, None, :]
+        return np.all((features >= self.lower) & (features <= self.upper), axis=2)
+
+    def match_batch(self, features):
+        """Return the first matching gesture name (in recording order) for each frame."""
+        matches = self.match_all(features)
+        if not self.names:  # No static gestures recorded (yet, or any more)
+            return ["No Match"] * len(matches)
+        first = np.argmax(matches, axis=1)
+        return [self.names[index] if found else "No Match" for index, found in zip(first, matches.any(axis=1))]
+
+    def match(self, features):
+        return self.match_batch(np.asarray(features, dtype=np.float64)[None])[0]
+
+    def distances(self, features):
+        """Return (N, G) distances of each frame to each gesture's recorded range, in threshold units.
+
+        0 is inside the recorded range and 1 on the edge of the range plus threshold, so
+        exactly the gestures match_all accepts are within 1; missing features are infinitely far.
+        """
+        features = np.asarray(features, dtype=np.float64)[:, None, :]
+        outside = np.maximum(self.lower - features, features - self.upper) / self.scale
+        return np.maximum(outside.max(axis=2, initial=-np.inf) + 1, 0)
+
+    def rank_batch(self, features, k=RANK_CANDIDATES):
+        return rank_candidates(self.distances(features), self.names, self.max_distance, k)
+
+    def rank(self, features, k=RANK_CANDIDATES):
+        return self.rank_batch(np.asarray(features, dtype=np.float64)[None], k)[0]
+
+    def match_rank_batch(self, features, k=RANK_CANDIDATES):
+        """match_batch and rank_batch from a single distances pass; the first gesture within max_distance matches."""
+        distances = self.distances(features)
+        if not self.names:
+            return ["No Match"] * len(distances), [[] for _ in distances]
+        within = distances <= self.max_distance
+        first = np.argmax(within, axis=1)
+        matches = [self.names[index] if found else "No Match" for index, found in zip(first, within.any(axis=1))]
+        return matches, rank_candidates(distances, self.names, self.max_distance, k)
+
+    def match_rank(self, features, k=RANK_CANDIDATES):
+        matches, ranked = self.match_rank_batch(np.asarray(features, dtype=np.float64)[None], k)
+        return matches[0], ranked[0]
+
+class NearestNeighborIndex:
+    """k-nearest-neighbour matcher over every stored sample.
+
+    Distances are the largest per-feature difference in units of that feature's threshold,
+    so a sample within 1.0 is one the range matcher would accept on its own. Samples are
+    grouped by the features they were recorded with, and each group gets its own KD-tree
+    over just those features. Votes are broken by summed distance, then recording order.
+    """
+
+    backend = "knn"
+
+    def __init__(self, store, thresholds, k=5, max_distance=1.0):
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:  # Optional: fall back to a brute-force search
+            cKDTree = None
 
-    gesture_ranges[gesture_name] = feature_ranges
+        self.k = k
+        self.max_distance = max_distance
+        self.names = []
+
+        scale = threshold_scale(thresholds)
+
+        points, labels = [], []
+        for gesture_name, samples in store.items():
+            if len(samples) == 0:
+                continue
+            points.append(np.asarray(samples, dtype=np.float64) / scale)
+            labels.append(np.full(len(samples), len(self.names)))
+            self.names.append(gesture_name)
+        points = np.concatenate(points) if points else np.empty((0, FEATURE_SIZE))
+        labels = np.concatenate(labels) if labels else np.empty(0, dtype=int)
+
+        self.scale = scale
+        self.groups = []
+        recorded = ~np.isnan(points)
+        for mask in np.unique(recorded, axis=0):
+            rows = np.all(recorded == mask, axis=1)
+            group_points = points[rows][:, mask]
+            tree = cKDTree(group_points) if cKDTree is not None else None
+            self.groups.append((mask, group_points, labels[rows], tree))
+
+    def _group_neighbors(self, features, mask, points, labels, tree):
+        k = min(self.k, len(points))
+        if tree is not None:
+            distances, indices = tree.query(features[:, mask], k=k, p=np.inf, distance_upper_bound=self.max_distance)
+            distances, indices = distances.reshape(len(features), k), indices.reshape(len(features), k)
+        else:
+            all_distances = np.abs(features[:, None, mask] - points[None]).max(axis=2)
+            indices = np.argsort(all_distances, axis=1, kind="stable")[:, :k]
+            distances = np.take_along_axis(all_distances, indices, axis=1)
+            distances[distances > self.max_distance] = np.inf
+
+        found = np.isfinite(distances)
+        return distances, np.where(found, labels[np.minimum(indices, len(points) - 1)], -1)
+
+    def neighbors(self, features):
+        """Return (N, k) distances and gesture labels of the nearest samples, -1 where none is in range."""
+        features = np.asarray(features, dtype=np.float64).reshape(-1, FEATURE_SIZE) / self.scale
+        results = [self._group_neighbors(features, *group) for group in self.groups]
+        if not results:
+            return np.full((len(features), 0), np.inf), np.full((len(features), 0), -1)
+
+        distances = np.concatenate([distances for distances, _ in results], axis=1)
+        labels = np.concatenate([labels for _, labels in results], axis=1)
+        order = np.lexsort((labels, distances), axis=1)[:, :self.k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+    def _votes(self, neighbor_distances, neighbor_labels):
+        matches = []
+        for distances, labels in zip(neighbor_distances, neighbor_labels):
+            found = labels >= 0
+            if not found.any():
+                matches.append("No Match")
+                continue
+            votes = np.bincount(labels[found], minlength=len(self.names))
+            summed = np.bincount(labels[found], weights=distances[found], minlength=len(self.names))
+            candidates = np.flatnonzero(votes == votes.max())
+            matches.append(self.names[candidates[np.argmin(summed[candidates])]])
+        return matches
+
+    def _gesture_distances(self, neighbor_distances, labels):
+        distances = np.full((len(labels), len(self.names)), np.inf)
+        rows, columns = np.nonzero(labels >= 0)
+        np.minimum.at(distances, (rows, labels[rows, columns]), neighbor_distances[rows, columns])
+        return distances
+
+    def match_batch(self, features):
+        return self._votes(*self.neighbors(features))
+
+    def match(self, features):
+        return self.match_batch(np.asarray(features, dtype=np.float64)[None])[0]
+
+    def distances(self, features):
+        """Return (N, G) distances of each frame to each gesture's closest sample, infinite beyond max_distance."""
+        return self._gesture_distances(*self.neighbors(features))
+
+    def rank_batch(self, features, k=RANK_CANDIDATES):
+        return rank_candidates(self.distances(features), self.names, self.max_distance, k)
+
+    def rank(self, features, k=RANK_CANDIDATES):
+        return self.rank_batch(np.asarray(features, dtype=np.float64)[None], k)[0]
+
+    def match_rank_batch(self, features, k=RANK_CANDIDATES):
+        """match_batch and rank_batch from a single neighbour search."""
+        neighbors = self.neighbors(features)
+        return self._votes(*neighbors), rank_candidates(self._gesture_distances(*neighbors), self.names, self.max_distance, k)
+
+    def match_rank(self, features, k=RANK_CANDIDATES):
+        matches, ranked = self.match_rank_batch(np.asarray(features, dtype=np.float64)[None], k)
+        return matches[0], ranked[0]
+
+def matcher_cache_key(store, thresholds):
+    payload = json.dumps([MATCHER_CACHE_VERSION, store.digest(), thresholds], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def load_range_index(store, thresholds, cache_path=None):
+    """GestureIndex for the store, loaded from the cache file if neither the store nor the thresholds changed."""
+    key = matcher_cache_key(store, thresholds)
+    index = GestureIndex.load(cache_path or os.path.join(store.path, MATCHER_CACHE), key, thresholds)
+    if index is None:
+        index = GestureIndex({}, thresholds).updated(store)
+        save_range_index(index, store, key, cache_path)
+    return index
+
+def save_range_index(index, store, key, cache_path=None):
+    index.key = key
+    if os.path.isdir(store.path):
+        try:
+            index.save(cache_path or os.path.join(store.path, MATCHER_CACHE), key)
+        except OSError:
+            pass  # A read-only store still works, it just cannot be cached
+
+def build_matcher(backend=None):
+    """Build the matcher for the gesture store (MATCHER_BACKEND by default); only the range matcher uses tuned thresholds."""
+    backend = backend or MATCHER_BACKEND
+    gesture_store = get_gesture_store()
+    current_thresholds = load_thresholds(gesture_store)
+    if backend == "range":
+        return load_range_index(gesture_store, current_thresholds)
+    if backend == "knn":
+        index = NearestNeighborIndex(gesture_store, thresholds)
+        index.key = matcher_cache_key(gesture_store, current_thresholds)
+        return index
+    raise ValueError(f"Unknown matcher backend: {backend}")
+
+gesture_index = None  # Built (or loaded from the cache) on the first match
+
+def set_matcher_backend(backend):
+    """Switch check_gesture_match to another backend; the matcher is rebuilt on the next match if it changed."""
+    global MATCHER_BACKEND, gesture_index
+    if backend not in MATCHER_BACKENDS:
+        raise ValueError(f"Unknown matcher backend: {backend}")
+    MATCHER_BACKEND = backend
+    if gesture_index is not None and gesture_index.backend != backend:
+        gesture_index = None
+
+def get_gesture_index():
+    global gesture_index
+    if gesture_index is None:
+        gesture_index = build_matcher()
+    return gesture_index
+
+def refresh_gesture_index():
+    """Pick up gestures added, replaced or removed in the store (by any process) without a restart.
+
+    Newly tuned thresholds are picked up the same way. The range matcher only recomputes
+    the gestures that changed (or all of them, if the thresholds did); the kNN matcher is rebuilt.
+    The new matcher replaces the old one in a single assignment, so matching can carry on
+    from other threads meanwhile. Returns True if the gestures changed.
+    """
+    global gesture_index
+    gesture_store = get_gesture_store()
+    gesture_store.reload()
+    current_thresholds = load_thresholds(gesture_store)
+    key = matcher_cache_key(gesture_store, current_thresholds)
+    if gesture_index is None or gesture_index.key == key:
+        return False
+
+    globals().pop("gesture_ranges", None)  # Recomputed on next access
+    if isinstance(gesture_index, GestureIndex):
+        index = gesture_index.updated(gesture_store, current_thresholds)
+        save_range_index(index, gesture_store, key)
+    else:
+        index = build_matcher(gesture_index.backend)  # Keep whichever backend is in use
+    gesture_index = index
+    return True
+
+class MatchSmoother:
+    """Most frequent match over a rolling window, updated in O(1) per frame.
+
+    Keeps a count per match plus the set of matches at each count, so the leader is known
+    without rescanning the window. With hysteresis, the output only switches once another
+    match leads the current one by more than that many frames. Each stream owns its own.
+    """
+
+    def __init__(self, window_size=window_size, hysteresis=0):
+        self.window_size = window_size
+        self.hysteresis = hysteresis
+        self.reset()
+
+    def reset(self):
+        self.window = deque()
+        self.counts = {}
+        self.by_count = {}  # count -> matches with that count, in the order they reached it
+        self.max_count = 0
+        self.current = "No Match"
+
+    def _increment(self, match):
+        count = self.counts.get(match, 0)
+        if count:
+            del self.by_count[count][match]
+        self.counts[match] = count + 1
+        self.by_count.setdefault(count + 1, {})[match] = None
+        self.max_count = max(self.max_count, count + 1)
+
+    def _decrement(self, match):
+        count = self.counts[match]
+        del self.by_count[count][match]
+        if count == 1:
+            del self.counts[match]
+        else:
+            self.counts[match] = count - 1
+            self.by_count[count - 1][match] = None
+        if count == self.max_count and not self.by_count[count]:
+            self.max_count -= 1
+
+    def update(self, match):
+        """Add one frame's match and return the smoothed match."""
+        if len(self.window) == self.window_size:
+            self._decrement(self.window.popleft())
+        self.window.append(match)
+        self._increment(match)
+
+        current_count = self.counts.get(self.current, 0)
+        if current_count == 0 or self.max_count - current_count > self.hysteresis:
+            self.current = next(iter(self.by_count[self.max_count]))
+        return self.current
+
+default_smoother = MatchSmoother()
 
 def is_within_range(current, feature_range, threshold):
     """Check if the current feature values are within the range plus/minus threshold."""
@@ -43,28 +508,34 @@ def is_within_range(current, feature_range, threshold):
     
     return np.all((current >= min_range) & (current <= max_range))
 
-def check_gesture_match(flexion, position, rotation):
-    """Check if the current gesture falls within the precomputed gesture ranges."""
-    for gesture_name, feature_ranges in gesture_ranges.items():
-        all_match = True
-        
-        if "flexion" in feature_ranges and not is_within_range(flexion, feature_ranges["flexion"], thresholds["Flexion"]):
-            all_match = False
-        if "position" in feature_ranges and not is_within_range(position, feature_ranges["position"], thresholds["Position"]):
-            all_match = False
-        if "rotation" in feature_ranges and not is_within_range(rotation, feature_ranges["rotation"], thresholds["Rotation"]):
-            all_match = False
-        
-        if all_match:
-            match_history.append(gesture_name)
-            return get_smooth_match()
-    
-    match_history.append("No Match")
-    return get_smooth_match()
+def feature_vector(flexion, position, rotation):
+    """Lay out the three feature lists returned by process_keypoints as one feature vector."""
+    features = np.empty(FEATURE_SIZE)
+    features[FEATURE_SLICES["flexion"]] = flexion
+    features[FEATURE_SLICES["position"]] = position
+    features[FEATURE_SLICES["rotation"]] = rotation
+    return features
+
+def check_gesture_match(flexion, position, rotation, smoother=None):
+    """Check if the current gesture falls within the precomputed gesture ranges.
 
-def get_smooth_match():
+    Pass each stream's own MatchSmoother; without one, a module-wide smoother is shared.
+    """
+    return match_features(feature_vector(flexion, position, rotation), smoother)
+
+def match_features(features, smoother=None):
+    """check_gesture_match for a (FEATURE_SIZE,) feature vector, e.g. from extract_features."""
+    return (smoother or default_smoother).update(get_gesture_index().match(features))
+
+def rank_features(features, k=RANK_CANDIDATES):
+    """Up to k Candidates for a (FEATURE_SIZE,) feature vector, closest first, unsmoothed."""
+    return get_gesture_index().rank(features, k)
+
+def match_and_rank_features(features, smoother=None, k=RANK_CANDIDATES):
+    """match_features and rank_features from one pass of the matcher; returns (smoothed match, Candidates)."""
+    match, candidates = get_gesture_index().match_rank(features, k)
+    return (smoother or default_smoother).update(match), candidates
+
+def get_smooth_match(smoother=None):
     """Return the most frequent match in the rolling window to smooth transitions."""
-    if not match_history:
-        return "No Match"
-    
-    return max(set(match_history), key=match_history.count)
+    return (smoother or default_smoother).current
@@ -0,0 +1,58 @@
+import numpy as np
+from feature_extraction import (DISTANCE_PAIRS, FEATURE_SIZE, calculate_position, calculate_rotation, euclidean_distance,
+                                extract_features, normalize_keypoints, normalize_pose_keypoints, normalize_pose_keypoints_batch,
+                                process_keypoints, process_keypoints_batch)
+
+def reference_features(left_hand, right_hand, pose):
+    """The original per-frame, tuple-list implementation of process_keypoints."""
+    pose = normalize_pose_keypoints(pose)
+    flexion, position, rotation = [], [], []
+    for hand, shoulder in ((left_hand, pose[11]), (right_hand, pose[12])):
+        keypoints = normalize_keypoints(hand)
+        for a, b in DISTANCE_PAIRS:
+            detected = keypoints[a] != (0, 0, 0) and keypoints[b] != (0, 0, 0)
+            flexion.append(euclidean_distance(keypoints[a], keypoints[b]) if detected else 0)
+        rotation.append(calculate_rotation(hand[0], hand[5]))
+        position.extend(calculate_position(hand[0], shoulder))
+    return np.array(flexion + position + rotation, dtype=np.float64)
+
+def random_frames(frames, seed=0):
+    """Keypoint frames with whole hands, single landmarks and shoulders missing (all zero) now and then."""
+    rng = np.random.default_rng(seed)
+    left_hands, right_hands, poses = rng.random((frames, 21, 3)), rng.random((frames, 21, 3)), rng.random((frames, 33, 3))
+    left_hands[rng.random(frames) < 0.2] = 0
+    right_hands[rng.random(frames) < 0.2] = 0
+    for hands in (left_hands, right_hands):
+        hands[rng.random((frames, 21)) < 0.05] = 0
+    poses[rng.random(frames) < 0.1, 11] = 0
+    return left_hands, right_hands, poses
+
+def as_lists(array):
+    return [tuple(point) for point in array.tolist()]
+
+def test_batch_matches_per_frame_reference():
+    left_hands, right_hands, poses = random_frames(200)
+    batch = process_keypoints_batch(left_hands, right_hands, poses)
+
+    assert batch.shape == (200, FEATURE_SIZE)
+    for i in range(len(poses)):
+        expected = reference_features(as_lists(left_hands[i]), as_lists(right_hands[i]), as_lists(poses[i]))
+        np.testing.assert_allclose(batch[i], expected, rtol=1e-12, atol=1e-12)
+
+def test_single_frame_paths_match_batch():
+    left_hands, right_hands, poses = random_frames(50, seed=1)
+    batch = process_keypoints_batch(left_hands, right_hands, poses)
+
+    for i in range(len(poses)):
+        flexion, position, rotation = process_keypoints(as_lists(left_hands[i]), as_lists(right_hands[i]), as_lists(poses[i]))
+        np.testing.assert_allclose(flexion + position + rotation, batch[i], rtol=1e-12)
+        hands = np.stack((left_hands[i], right_hands[i])).astype(np.float32)
+        np.testing.assert_allclose(extract_features(hands, poses[i].astype(np.float32)), batch[i], rtol=1e-5, atol=1e-5)
+
+def test_pose_normalization_matches_per_frame():
+    _, _, poses = random_frames(100, seed=2)
+    poses[:5, 12] = 0  # The other shoulder missing too
+    batch = normalize_pose_keypoints_batch(poses)
+
+    for i in range(len(poses)):
+        np.testing.assert_allclose(batch[i], normalize_pose_keypoints(as_lists(poses[i])), rtol=1e-12)
@@ -0,0 +1,36 @@
+import os
+import numpy as np
+from feature_extraction import FEATURE_SIZE
+from gesture_store import LOCK_FILE, GestureStore
+
+def samples(value, count=3):
+    return np.full((count, FEATURE_SIZE), value, dtype=np.float32)
+
+def test_writers_opened_earlier_do_not_lose_or_overwrite_gestures(tmp_path):
+    path = str(tmp_path / "store")
+    first, second, third = GestureStore(path), GestureStore(path), GestureStore(path)
+    first.add_gesture("x", samples(1))
+    stale = GestureStore(path)  # Opened before "y" is added
+    third.add_gesture("y", samples(2))
+    stale.add_gesture("z", samples(3))
+    second.remove_gesture("x")
+
+    store = GestureStore(path)
+    assert list(store) == ["y", "z"]
+    assert store.samples("y")[0, 0] == 2
+    assert store.samples("z")[0, 0] == 3
+    files = [entry["file"] for entry in store.header["gestures"].values()]
+    assert len(set(files)) == 2
+    assert sorted(name for name in os.listdir(path) if name.endswith(".npy")) == sorted(files)
+    assert not os.path.exists(os.path.join(path, LOCK_FILE))
+
+def test_replacing_a_gesture_writes_a_new_file(tmp_path):
+    store = GestureStore(str(tmp_path / "store"))
+    store.add_gesture("x", samples(1))
+    file_name = store.header["gestures"]["x"]["file"]
+    digest = store.digest()
+    store.add_gesture("x", samples(4, count=5))
+
+    assert store.header["gestures"]["x"]["file"] != file_name
+    assert store.digest() != digest
+    assert len(store.samples("x")) == 5
@@ -0,0 +1,38 @@
+import time
+from types import SimpleNamespace
+from pipeline import FrameQueue, InferenceWorker, StageTimer
+
+class FlakyRecognizer:
+    """Fails on the frames listed in failures, like a MediaPipe error would."""
+
+    def __init__(self, failures):
+        self.timer = StageTimer()
+        self.failures = set(failures)
+
+    def process(self, captured_at, frame):
+        if frame in self.failures:
+            raise RuntimeError(f"frame {frame} failed")
+        return SimpleNamespace(captured_at=captured_at, frame=frame, results_hands=SimpleNamespace(multi_hand_landmarks=None))
+
+def test_worker_survives_failing_frames(capsys):
+    frames, results = FrameQueue(maxsize=10), FrameQueue(maxsize=10)
+    recognizer = FlakyRecognizer(failures={1, 2})
+    worker = InferenceWorker(recognizer, frames, results)
+    worker.start()
+    try:
+        for frame in range(4):
+            frames.put((time.perf_counter(), frame))
+        received = []
+        deadline = time.monotonic() + 5
+        while len(received) < 2 and time.monotonic() < deadline:
+            result = results.get(timeout=0.1)
+            if result is not None:
+                received.append(result.frame)
+    finally:
+        worker.stop()
+        worker.join(timeout=1)
+
+    assert received == [0, 3]
+    assert recognizer.timer.counters["errors"] == 2
+    assert recognizer.timer.counters["processed"] == 2
+    assert "frame 1 failed" in capsys.readouterr().out
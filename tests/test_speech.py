@@ -0,0 +1,66 @@
+import asyncio
+from speech import CHUNK_SIZE, SAMPLE_WIDTH, AudioRingBuffer, AudioStream, SpeechSession, StubRecognizerBackend
+
+CHUNK_BYTES = CHUNK_SIZE * SAMPLE_WIDTH
+
+def joined(views):
+    return b"".join(bytes(view) for view in views)
+
+def test_ring_buffer_reads_across_wrap():
+    ring = AudioRingBuffer(10)
+    ring.write(b"abcdefgh")
+    ring.write(b"ijklm")  # Wraps: the ring now holds "defghijklm"
+
+    assert (ring.start, ring.end) == (3, 13)
+    views = ring.read(5, 12)
+    assert len(views) == 2
+    assert joined(views) == b"fghijkl"
+    assert joined(ring.read(0, 100)) == b"defghijklm"  # Clipped to what is still held
+    assert ring.read(13, 20) == []
+
+def test_ring_buffer_write_larger_than_capacity():
+    ring = AudioRingBuffer(4)
+    ring.write(b"ab")
+    ring.write(b"cdefgh")
+
+    assert (ring.start, ring.end) == (4, 8)
+    assert joined(ring.read(ring.start, ring.end)) == b"efgh"
+
+class RecordingBackend(StubRecognizerBackend):
+    """The stub, also keeping the audio each stream received."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streams = []
+
+    def stream(self, audio_chunks):
+        received = bytearray()
+        self.streams.append(received)
+
+        async def recorded():
+            async for chunk in audio_chunks:
+                received.extend(chunk)
+                yield chunk
+
+        return super().stream(recorded())
+
+def test_session_bridges_audio_after_last_final_across_restarts():
+    chunks = [bytes([i]) * CHUNK_BYTES for i in range(12)]
+    backend = RecordingBackend(["one", "two", "three"], chunks_per_transcript=3, chunks_per_stream=5)
+
+    async def run():
+        audio = AudioStream(asyncio.get_running_loop(), bridging_window_ms=1000)
+        for chunk in chunks:
+            audio.push(chunk)
+        audio.close()
+        await asyncio.sleep(0)  # Let the pushed chunks be enqueued
+        return await SpeechSession(backend, audio).run()
+
+    transcription = asyncio.run(run())
+
+    assert transcription == "one\ntwo\nthree\n"
+    assert len(backend.streams) == 3
+    # Each restarted stream first gets the audio heard after the previous stream's last final result
+    assert backend.streams[0] == b"".join(chunks[0:5])
+    assert backend.streams[1] == b"".join(chunks[3:9])
+    assert backend.streams[2] == b"".join(chunks[7:12])
@@ -0,0 +1,80 @@
+from collections import Counter, deque
+import numpy as np
+import pytest
+import static_detection
+from feature_extraction import FEATURE_SIZE
+from gesture_store import GestureStore
+from static_detection import GestureIndex, MatchSmoother, NearestNeighborIndex, compute_gesture_ranges, thresholds
+
+@pytest.mark.parametrize("window_size, hysteresis", [(1, 0), (5, 0), (5, 2), (8, 3)])
+def test_smoother_follows_window_majority(window_size, hysteresis):
+    rng = np.random.default_rng(window_size + hysteresis)
+    matches = rng.choice(["A", "B", "C", "No Match"], size=500, p=[0.4, 0.3, 0.2, 0.1])
+    smoother = MatchSmoother(window_size, hysteresis)
+    window = deque(maxlen=window_size)
+    current = "No Match"
+
+    for match in matches:
+        window.append(match)
+        counts = Counter(window)
+        leader_count = max(counts.values())
+        smoothed = smoother.update(match)
+        if counts[current] and leader_count - counts[current] <= hysteresis:
+            assert smoothed == current  # Ties and small leads keep the output steady
+        else:
+            assert counts[smoothed] == leader_count
+        current = smoothed
+
+def test_smoother_reset():
+    smoother = MatchSmoother(3)
+    for match in ("A", "A", "B"):
+        smoother.update(match)
+    smoother.reset()
+    assert smoother.current == "No Match"
+    assert smoother.update("B") == "B"
+
+@pytest.fixture
+def store(tmp_path):
+    """A store of four gestures, one recorded without position like most real ones."""
+    rng = np.random.default_rng(0)
+    store = GestureStore(str(tmp_path / "store"))
+    for i, name in enumerate(["one", "two", "three", "four"]):
+        samples = rng.normal(i * 0.05, 0.02, (20, FEATURE_SIZE)).astype(np.float32)
+        samples[:, 24:26] = rng.normal(i * 20, 5, (20, 2))
+        if name == "two":
+            samples[:, 18:24] = np.nan
+        store.add_gesture(name, samples)
+    return store
+
+def queries(store, frames=300):
+    rng = np.random.default_rng(1)
+    samples = np.nan_to_num(np.concatenate([np.asarray(samples) for _, samples in store.items()]))
+    rows = samples[rng.integers(len(samples), size=frames)]
+    return rows + rng.normal(0, 0.05, rows.shape) * np.abs(rows)
+
+@pytest.mark.parametrize("backend", ["range", "knn"])
+def test_match_rank_agrees_with_match_and_rank(store, backend):
+    if backend == "range":
+        index = GestureIndex(compute_gesture_ranges(store), thresholds)
+    else:
+        index = NearestNeighborIndex(store, thresholds)
+    features = queries(store)
+
+    matches, ranked = index.match_rank_batch(features)
+    assert matches == index.match_batch(features)
+    assert ranked == index.rank_batch(features)
+    assert any(match != "No Match" for match in matches)
+    for row in features[:20]:
+        assert index.match_rank(row) == (index.match(row), index.rank(row))
+
+@pytest.mark.parametrize("backend", ["range", "knn"])
+def test_empty_store_matches_nothing(tmp_path, monkeypatch, backend):
+    empty = GestureStore(str(tmp_path / "empty"))
+    index = GestureIndex({}, thresholds).updated(empty) if backend == "range" else NearestNeighborIndex(empty, thresholds)
+    monkeypatch.setattr(static_detection, "gesture_index", index)
+    features = np.zeros(FEATURE_SIZE)
+
+    assert index.match_batch(np.zeros((2, FEATURE_SIZE))) == ["No Match", "No Match"]
+    assert index.match_rank(features) == ("No Match", [])
+    assert static_detection.check_gesture_match([0] * 18, [0] * 6, [0] * 2, MatchSmoother()) == "No Match"
+    assert static_detection.match_and_rank_features(features, MatchSmoother()) == ("No Match", [])
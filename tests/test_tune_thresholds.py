@@ -0,0 +1,21 @@
+import numpy as np
+from static_detection import threshold_scale, thresholds
+from tune_thresholds import MAX_THRESHOLD, no_worse, tune
+
+def test_tune_never_tightens_below_global_thresholds():
+    scale = threshold_scale(thresholds)
+    needed = np.stack([np.zeros_like(scale), scale * 0.5, scale * 1.5, scale * 10, np.full_like(scale, np.nan)])
+    tuned = tune(needed, slack=0.0)
+
+    np.testing.assert_allclose(tuned[0], scale)  # Held-out samples never left the range
+    np.testing.assert_allclose(tuned[1], scale)
+    np.testing.assert_allclose(tuned[2], scale * 1.5)
+    np.testing.assert_allclose(tuned[3], scale * MAX_THRESHOLD)
+    np.testing.assert_allclose(tuned[4], scale)  # Nothing learnt
+
+def test_no_worse_requires_recall_and_misfires():
+    before = {"recall": 0.9, "misfires": 0.05}
+    assert no_worse(before, {"recall": 0.9, "misfires": 0.05})
+    assert no_worse(before, {"recall": 0.95, "misfires": 0.04})
+    assert not no_worse(before, {"recall": 0.89, "misfires": 0.01})
+    assert not no_worse(before, {"recall": 0.99, "misfires": 0.06})
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import warnings
+import numpy as np
+from gesture_store import GESTURE_STORE, open_store
+from static_detection import TUNED_THRESHOLDS, GestureIndex, compute_feature_ranges, threshold_scale, thresholds
+
+RECALL = 1.0  # Fraction of each gesture's held-out samples its tuned range must accept, per dimension
+SLACK = 0.1  # Headroom added on top of what the held-out samples need
+# Tuned thresholds stay between these multiples of the global ones. Held-out samples that never
+# leave their range are no evidence that a tighter threshold is safe, so they are never tightened.
+MIN_THRESHOLD = 1.0
+MAX_THRESHOLD = 2.0
+EVALUATION_FRACTION = 0.3  # Samples of each gesture kept out of tuning altogether, to score it on
+BATCH_SIZE = 1024  # Samples matched against every gesture at once during evaluation
+
+# Every gesture is tuned at once on (G, N, D) arrays: each static gesture's samples padded
+# with NaN to the largest gesture. valid marks the real samples, queries the ones that are
+# held out, and (lower, upper) is each query's own gesture range without it.
+#
+# The reported accuracy is nested: tuning (with its own leave-one-out or holdout queries)
+# only sees part of each gesture, and both the global and the tuned matcher are scored on
+# the rest. Running apps load the written thresholds automatically, so they are only written
+# with --write, and only if that evaluation shows them no worse than the global ones; they
+# are then tuned on all samples.
+
+def padded_samples(store, index):
+    """Stack the samples of the index's gestures into a NaN-padded (G, N, D) array, plus the (G, N) valid mask."""
+    arrays = [np.asarray(store.samples(name), dtype=np.float64) for name in index.names]
+    size = max((len(array) for array in arrays), default=0)
+    samples = np.full((len(arrays), size, index.mask.shape[1]), np.nan)
+    valid = np.zeros((len(arrays), size), dtype=bool)
+    for row, array in enumerate(arrays):
+        samples[row, :len(array)] = array
+        valid[row, :len(array)] = True
+    return samples, valid
+
+def leave_one_out_ranges(samples, valid):
+    """Each sample's gesture range computed without it, from the two smallest and largest values."""
+    ascending = np.sort(samples, axis=1)  # NaN padding sorts last
+    descending = -np.sort(-samples, axis=1)
+    lower = np.where(samples <= ascending[:, :1], ascending[:, 1:2], ascending[:, :1])
+    upper = np.where(samples >= descending[:, :1], descending[:, 1:2], descending[:, :1])
+    queries = valid & (valid.sum(axis=1, keepdims=True) >= 2)
+    return lower, upper, queries
+
+def holdout_ranges(samples, valid, fraction, rng):
+    """Hold out a random fraction of each gesture's samples; the rest give the range they are checked against."""
+    queries = valid & (rng.random(valid.shape) < fraction)
+    queries[:, 0] = False  # Every gesture keeps at least one sample to build its range from
+    train = np.where(queries[..., None] | ~valid[..., None], np.nan, samples)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Dimensions a gesture did not record are all NaN
+        lower = np.broadcast_to(np.nanmin(train, axis=1, keepdims=True), samples.shape)
+        upper = np.broadcast_to(np.nanmax(train, axis=1, keepdims=True), samples.shape)
+    return lower, upper, queries
+
+def evaluation_split(valid, fraction, rng):
+    """Mark a random fraction of each gesture's samples for evaluation only; two are always left to tune on."""
+    evaluation = valid & (rng.random(valid.shape) < fraction)
+    evaluation[:, :2] = False
+    return evaluation
+
+def needed_thresholds(samples, lower, upper, queries, mask, recall=RECALL):
+    """(G, D) threshold each gesture needs per dimension to accept the recall quantile of its held-out samples.
+
+    NaN where a gesture has no held-out samples or did not record that dimension.
+    """
+    excess = np.maximum(np.maximum(lower - samples, samples - upper), 0)
+    excess[~queries] = np.nan
+    excess[~np.broadcast_to(mask[:, None, :], excess.shape)] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanquantile(excess, recall, axis=1)
+
+def tune(needed, base_thresholds=thresholds, slack=SLACK, min_threshold=MIN_THRESHOLD, max_threshold=MAX_THRESHOLD):
+    """Turn needed thresholds into tuned (G, D) ones, keeping the global thresholds where nothing was learnt."""
+    scale = threshold_scale(base_thresholds)
+    tuned = np.clip(needed * (1 + slack), scale * min_threshold, scale * max_threshold)
+    return np.where(np.isnan(needed), scale, tuned)
+
+def tune_samples(samples, rows, mask, holdout=None, rng=None, recall=RECALL, slack=SLACK):
+    """Tuned (G, D) thresholds learnt from the samples in rows only, by leave-one-out or a holdout fraction."""
+    samples = np.where(rows[..., None], samples, np.nan)  # Everything else is treated as padding
+    if holdout is None:
+        lower, upper, queries = leave_one_out_ranges(samples, rows)
+    else:
+        lower, upper, queries = holdout_ranges(samples, rows, holdout, rng)
+    return tune(needed_thresholds(samples, lower, upper, queries, mask, recall), slack=slack)
+
+def split_index(names, samples, rows, tuned=None):
+    """A range index built from each gesture's samples in rows, with the global or the given tuned thresholds."""
+    gesture_ranges = {name: compute_feature_ranges(samples[row][rows[row]]) for row, name in enumerate(names)}
+    split_thresholds = thresholds
+    if tuned is not None:
+        split_thresholds = dict(thresholds, gestures={name: values.tolist() for name, values in zip(names, tuned)})
+    return GestureIndex(gesture_ranges, split_thresholds)
+
+def accepted(index, features):
+    """(S, G) matrix of which gestures accept each of the (S, D) samples.
+
+    Like GestureIndex.match_all, except that dimensions a sample did not record (NaN) pass
+    for every gesture: live frames always have a value there, it just is not known.
+    """
+    result = np.zeros((len(features), len(index.names)), dtype=bool)
+    for start in range(0, len(features), BATCH_SIZE):
+        batch = features[start:start + BATCH_SIZE, None, :]
+        within = (batch >= index.lower) & (batch <= index.upper) | np.isnan(batch)
+        result[start:start + BATCH_SIZE] = np.all(within, axis=2)
+    return result
+
+def confusion_matrix(accepted_matrix, gestures, size):
+    """(G, G + 1) counts of each gesture's held-out samples by the gesture the matcher picks, No Match last."""
+    found = accepted_matrix.any(axis=1)
+    predicted = np.where(found, np.argmax(accepted_matrix, axis=1), size)  # First match in recording order
+    confusion = np.zeros((size, size + 1), dtype=int)
+    np.add.at(confusion, (gestures, predicted), 1)
+    return confusion
+
+def overlapping_ranges(index):
+    """(G, G) boolean matrix of gestures whose ranges plus thresholds intersect in every dimension they share."""
+    lower, upper = index.lower[:, None, :], index.upper[:, None, :]
+    overlaps = np.all((lower <= index.upper[None]) & (index.lower[None] <= upper), axis=2)
+    np.fill_diagonal(overlaps, False)
+    return overlaps
+
+def evaluate(index, samples, rows):
+    """Accuracy of an index on the samples in rows: recall, misfires (another gesture picked), ambiguity and the confusion matrix.
+
+    Only meaningful for samples the index (and its thresholds) were not built from.
+    """
+    gestures, positions = np.nonzero(rows)
+    accepted_matrix = accepted(index, samples[gestures, positions])
+    confusion = confusion_matrix(accepted_matrix, gestures, len(index.names))
+    total = max(len(gestures), 1)
+    correct = np.trace(confusion[:, :-1])
+    return {
+        "samples": len(gestures),
+        "recall": correct / total,
+        "misfires": (len(gestures) - correct - confusion[:, -1].sum()) / total,
+        "no_match": confusion[:, -1].sum() / total,
+        "ambiguous": (accepted_matrix.sum(axis=1) > 1).sum() / total,
+        "overlapping_pairs": int(overlapping_ranges(index).sum() // 2),
+        "confusion": confusion,
+    }
+
+def no_worse(before, after):
+    """Whether the tuned evaluation keeps at least the global recall without more misfires."""
+    return after["recall"] >= before["recall"] and after["misfires"] <= before["misfires"]
+
+def write_thresholds(path, index, tuned, settings):
+    """Atomically write the tuned thresholds for static_detection.load_thresholds, keyed by each gesture's file."""
+    data = dict(settings, base=thresholds, gestures={
+        name: {"file": file, "thresholds": row.tolist()}
+        for name, file, row in zip(index.names, index.files, tuned)
+    })
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+def format_evaluation(label, evaluation):
+    return (f"{label:>7}: recall {evaluation['recall']:.1%} | misfires {evaluation['misfires']:.1%} | "
+            f"no match {evaluation['no_match']:.1%} | ambiguous {evaluation['ambiguous']:.1%} | "
+            f"overlapping range pairs {evaluation['overlapping_pairs']}")
+
+def format_confusions(names, confusion, limit=10):
+    """The most frequent misfires, as "true -> picked: count" lines."""
+    errors = confusion[:, :-1].copy()
+    np.fill_diagonal(errors, 0)
+    lines = []
+    for flat in np.argsort(errors, axis=None)[::-1][:limit]:
+        true, picked = np.unravel_index(flat, errors.shape)
+        if errors[true, picked]:
+            lines.append(f"  {names[true]} -> {names[picked]}: {errors[true, picked]} of {confusion[true].sum()}")
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune per-gesture thresholds on held-out samples and report overlapping gestures.")
+    parser.add_argument("store_path", nargs="?", default=GESTURE_STORE)
+    parser.add_argument("--holdout", type=float, default=None,
+                        help="Hold out this fraction of each gesture's samples instead of leaving one out at a time")
+    parser.add_argument("--recall", type=float, default=RECALL, help="Quantile of held-out samples each dimension must accept")
+    parser.add_argument("--slack", type=float, default=SLACK)
+    parser.add_argument("--evaluate", type=float, default=EVALUATION_FRACTION,
+                        help="Fraction of each gesture's samples kept out of tuning to report accuracy on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--confusion", help="Also write the tuned confusion matrix to this CSV file")
+    parser.add_argument("--write", action="store_true",
+                        help=f"Write {TUNED_THRESHOLDS} if the tuned thresholds evaluate no worse than the global ones")
+    args = parser.parse_args()
+
+    store = open_store(args.store_path)
+    index = GestureIndex({}, thresholds).updated(store)
+    samples, valid = padded_samples(store, index)
+    rng = np.random.default_rng(args.seed)
+    method = "leave-one-out" if args.holdout is None else f"holdout {args.holdout:g}"
+
+    evaluation = evaluation_split(valid, args.evaluate, rng)
+    tuning = valid & ~evaluation
+    split_tuned = tune_samples(samples, tuning, index.mask, args.holdout, rng, args.recall, args.slack)
+    before = evaluate(split_index(index.names, samples, tuning), samples, evaluation)
+    after = evaluate(split_index(index.names, samples, tuning, split_tuned), samples, evaluation)
+
+    print(f"{len(index.names)} gestures, tuned by {method} on {tuning.sum()} samples, "
+          f"evaluated on {before['samples']} samples never used for tuning")
+    print(format_evaluation("global", before))
+    print(format_evaluation("tuned", after))
+    lines = format_confusions(index.names, after["confusion"])
+    if lines:
+        print("Most confused (tuned):")
+        print("\n".join(lines))
+
+    if args.confusion:
+        header = ",".join(["gesture"] + index.names + ["No Match"])
+        rows = [",".join([name] + [str(count) for count in row]) for name, row in zip(index.names, after["confusion"])]
+        with open(args.confusion, "w") as f:
+            f.write("\n".join([header] + rows) + "\n")
+
+    if args.write and not no_worse(before, after):
+        print(f"Not writing {TUNED_THRESHOLDS}: the tuned thresholds lose recall or misfire more than the global ones")
+    elif args.write:
+        tuned = tune_samples(samples, valid, index.mask, args.holdout, rng, args.recall, args.slack)
+        path = os.path.join(store.path, TUNED_THRESHOLDS)
+        write_thresholds(path, index, tuned, {"method": method, "recall": args.recall, "slack": args.slack})
+        print(f"Wrote {path}; running apps pick it up on their next gesture reload")